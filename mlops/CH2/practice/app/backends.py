@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from metrics import LLM_BACKEND_LATENCY, LLM_BACKEND_OUTSTANDING, LLM_BACKEND_UP
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class NoBackendAvailableError(Exception):
+    """Every LLM backend is ejected by its circuit breaker."""
+
+
+def _percentile(values: List[float], q: float):
+    return round(float(np.percentile(values, q)), 2) if values else None
+
+
+class Backend:
+    def __init__(self, url: str, history: int):
+        self.url = url
+        self.state = CLOSED
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.latencies_ms = deque(maxlen=history)
+
+    def stats(self) -> Dict:
+        latencies = list(self.latencies_ms)
+        return {
+            "url": self.url,
+            "state": self.state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+        }
+
+
+class BackendPool:
+    """Routes LLM calls across replicas.
+
+    Each call goes to the available replica with the fewest outstanding
+    requests (ties: lowest recent median latency). A circuit breaker per
+    replica opens after failure_threshold consecutive failures; after
+    cooldown seconds it goes half-open and lets a single trial call
+    through, which closes it again on success or re-opens it on failure.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        failure_threshold: int = 3,
+        cooldown: float = 10.0,
+        history: int = 100,
+    ):
+        self.backends = [Backend(url, history) for url in urls]
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+        for backend in self.backends:
+            LLM_BACKEND_OUTSTANDING.labels(backend.url).set_function(
+                lambda b=backend: b.outstanding
+            )
+            LLM_BACKEND_UP.labels(backend.url).set_function(
+                lambda b=backend: 0 if b.state == OPEN else 1
+            )
+
+    def _available(self, backend: Backend, now: float) -> bool:
+        if backend.state == CLOSED:
+            return True
+        if backend.state == OPEN and now - backend.opened_at >= self.cooldown:
+            backend.state = HALF_OPEN
+        # Half-open: one trial call at a time
+        return backend.state == HALF_OPEN and backend.outstanding == 0
+
+    def _acquire(self) -> Backend:
+        with self._lock:
+            now = time.monotonic()
+            candidates = [b for b in self.backends if self._available(b, now)]
+            if not candidates:
+                raise NoBackendAvailableError("All LLM backends are unavailable")
+            backend = min(
+                candidates,
+                key=lambda b: (
+                    b.outstanding,
+                    np.median(b.latencies_ms) if b.latencies_ms else 0.0,
+                ),
+            )
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def _release(self, backend: Backend, ok: bool, elapsed: float) -> None:
+        with self._lock:
+            backend.outstanding -= 1
+            if ok:
+                backend.latencies_ms.append(elapsed * 1000)
+                LLM_BACKEND_LATENCY.labels(backend.url).observe(elapsed)
+                backend.consecutive_failures = 0
+                if backend.state != CLOSED:
+                    logger.info(f"LLM backend {backend.url} recovered")
+                backend.state = CLOSED
+                return
+
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if backend.state == HALF_OPEN or (
+                backend.consecutive_failures >= self.failure_threshold
+            ):
+                if backend.state != OPEN:
+                    logger.warning(f"LLM backend {backend.url} ejected")
+                backend.state = OPEN
+                backend.opened_at = time.monotonic()
+
+    @contextmanager
+    def route(self) -> Iterator[str]:
+        """Yields the base URL to call; an exception inside the block counts
+        as a failure of that replica unless it is a client (4xx) error."""
+        backend = self._acquire()
+        start = time.perf_counter()
+        try:
+            yield backend.url
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            self._release(backend, not is_backend_failure(e), elapsed)
+            raise
+        except BaseException:
+            # Cancelled by the caller: not the replica's fault, record nothing
+            with self._lock:
+                backend.outstanding -= 1
+            raise
+        else:
+            self._release(backend, True, time.perf_counter() - start)
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            return [backend.stats() for backend in self.backends]
+
+
+def is_backend_failure(e: Exception) -> bool:
+    """Server errors and transport errors count against a replica; a 4xx
+    means the request itself was bad."""
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is None or status >= 500
@@ -0,0 +1,107 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Generic, List, TypeVar
+
+from metrics import BATCH_SIZE, BATCH_WAIT
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_STOP = object()
+
+
+class MicroBatcher(Generic[T, R]):
+    """Runs fn over items submitted by concurrent callers in shared batches.
+
+    A single worker thread takes the first waiting item, keeps collecting
+    for up to window_ms (or until max_batch items), then calls fn(items) once
+    and resolves every caller's future with its own result. Under load the
+    model sees full batches; an idle caller waits at most window_ms extra.
+    fn must return one result per item, in order.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[T]], List[R]],
+        max_batch: int = 32,
+        window_ms: float = 5.0,
+        name: str = "batcher",
+    ):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.window = window_ms / 1000
+        self.name = name
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: T) -> Future:
+        future: Future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout > 0:
+                    entry = self._queue.get(timeout=timeout)
+                else:
+                    entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                # Finish this batch, then stop
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            # Claims each future; callers cancelled while queued (e.g. a
+            # client that went away) are dropped instead of computed
+            batch = [
+                entry
+                for entry in self._collect(first)
+                if entry[1].set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+
+            now = time.perf_counter()
+            BATCH_SIZE.labels(self.name).observe(len(batch))
+            for _, _, queued_at in batch:
+                BATCH_WAIT.labels(self.name).observe(now - queued_at)
+
+            try:
+                results = self.fn([item for item, _, _ in batch])
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {e}")
+                for _, future, _ in batch:
+                    self._resolve(future.set_exception, e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                self._resolve(future.set_result, result)
+
+    def _resolve(self, setter: Callable, value) -> None:
+        # Nothing may escape _run: the worker is the only thread serving
+        # every caller
+        try:
+            setter(value)
+        except Exception as e:
+            logger.error(f"{self.name} could not resolve a result: {e}")
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
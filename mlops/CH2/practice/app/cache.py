@@ -0,0 +1,145 @@
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form used as cache key: "  Sintomas de  Dengue? " -> "sintomas de dengue"."""
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.lower().split()).rstrip("?!.")
+
+
+class EmbeddingCache:
+    """Thread-safe LRU cache with TTL for query embeddings."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at > time.monotonic():
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class SemanticAnswerCache:
+    """Caches generated answers by question meaning.
+
+    A lookup hits when a cached question has cosine similarity >= threshold
+    with the new one AND was answered from the same set of retrieved
+    documents. Entries are tied to a data generation: when the collection
+    changes (ingest), everything cached for older generations is dropped.
+    """
+
+    def __init__(self, max_size: int = 256, threshold: float = 0.95):
+        self.max_size = max_size
+        self.threshold = threshold
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._next_id = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _advance(self, generation: int) -> bool:
+        """Moves to a newer generation (dropping stale entries). Returns False
+        for callers still holding an older one."""
+        if generation > self._generation:
+            self._entries.clear()
+            self._generation = generation
+        return generation == self._generation
+
+    def lookup(
+        self, vector: Sequence[float], doc_ids: List[str], generation: int
+    ) -> Optional[Any]:
+        if self.max_size <= 0:
+            return None
+        doc_key = frozenset(doc_ids)
+        query = self._unit(vector)
+        with self._lock:
+            if not self._advance(generation):
+                self.misses += 1
+                return None
+            best_id, best_score = None, self.threshold
+            for entry_id, (entry_vector, entry_docs, _) in self._entries.items():
+                if entry_docs != doc_key:
+                    continue
+                score = float(np.dot(query, entry_vector))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][2]
+
+    def store(
+        self, vector: Sequence[float], doc_ids: List[str], generation: int, value: Any
+    ) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if not self._advance(generation):
+                return
+            self._entries[self._next_id] = (self._unit(vector), frozenset(doc_ids), value)
+            self._next_id += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
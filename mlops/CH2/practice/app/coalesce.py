@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from metrics import SINGLEFLIGHT
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls into one.
+
+    The first caller for a key (the leader) starts the work; callers with the
+    same key arriving while it runs (followers) await the same task instead
+    of starting their own. Nothing is kept once the call finishes: this is
+    for bursts of identical requests, not a cache.
+
+    The work runs as its own task, shielded from the callers, so a client
+    that disconnects does not cancel the result for everyone else.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Returns (result, coalesced); coalesced is True for followers."""
+        task = self._inflight.get(key)
+        if task is not None:
+            SINGLEFLIGHT.labels(self.name, "follower").inc()
+            return await asyncio.shield(task), True
+
+        SINGLEFLIGHT.labels(self.name, "leader").inc()
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task), False
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved if every caller went away
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,112 @@
+import math
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Sentence ends: punctuation followed by whitespace, or a line break
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Rough token count; the LLM's tokenizer is not loaded in the API."""
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+def format_context(texts: List[str]) -> str:
+    return "\n".join(f"- {t}" for t in texts)
+
+
+class ContextCompressor:
+    """Extractive compression of the retrieved context before the LLM call.
+
+    Chunks are split into sentences, each sentence is scored by cosine
+    similarity with the question embedding, near-duplicates of an already
+    kept sentence are dropped, and the best sentences are kept until the
+    token budget is used. Kept sentences go back in their original order.
+    The budget applies to the context; the report also estimates the whole
+    prompt (system message and question included) when given render.
+    """
+
+    def __init__(self, embedder):
+        self.enabled = os.getenv("CONTEXT_COMPRESSION", "false").lower() == "true"
+        self.token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "256"))
+        self.dedupe_threshold = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.92"))
+        self.chars_per_token = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "4"))
+        self.embedder = embedder
+
+    def compress(
+        self,
+        question_vector: List[float],
+        texts: List[str],
+        render: Optional[Callable[[str], str]] = None,
+    ) -> Tuple[str, Optional[Dict]]:
+        """Returns (context, info); info is None when compression is disabled.
+        render(context) gives the full prompt text sent to the LLM; with it,
+        info also reports prompt_tokens_before/after."""
+        context = format_context(texts)
+        if not self.enabled:
+            return context, None
+
+        tokens_before = estimate_tokens(context, self.chars_per_token)
+        prompt_before = (
+            estimate_tokens(render(context), self.chars_per_token) if render else None
+        )
+        sentences = [
+            (doc, pos, sentence)
+            for doc, text in enumerate(texts)
+            for pos, sentence in enumerate(split_sentences(text))
+        ]
+        info = {
+            "applied": False,
+            "context_tokens_before": tokens_before,
+            "context_tokens_after": tokens_before,
+            "prompt_tokens_before": prompt_before,
+            "prompt_tokens_after": prompt_before,
+            "sentences_before": len(sentences),
+            "sentences_after": len(sentences),
+        }
+        if tokens_before <= self.token_budget or not sentences:
+            return context, info
+
+        vectors = np.stack(list(self.embedder.embed([s for _, _, s in sentences])))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        question = np.array(question_vector, dtype=vectors.dtype)
+        question /= np.linalg.norm(question)
+        scores = vectors @ question
+
+        kept: List[int] = []
+        used = 0
+        for i in np.argsort(-scores):
+            if kept and float(np.max(vectors[kept] @ vectors[i])) >= self.dedupe_threshold:
+                continue
+            cost = estimate_tokens(sentences[i][2], self.chars_per_token) + 1
+            # The best sentence is always kept, even if it alone exceeds the budget
+            if used + cost > self.token_budget and kept:
+                continue
+            kept.append(int(i))
+            used += cost
+
+        by_doc: Dict[int, List[Tuple[int, str]]] = {}
+        for i in sorted(kept, key=lambda i: sentences[i][:2]):
+            doc, pos, sentence = sentences[i]
+            by_doc.setdefault(doc, []).append((pos, sentence))
+        compressed = format_context(
+            [" ".join(s for _, s in by_doc[doc]) for doc in sorted(by_doc)]
+        )
+
+        info.update(
+            applied=True,
+            context_tokens_after=estimate_tokens(compressed, self.chars_per_token),
+            sentences_after=len(kept),
+        )
+        if render:
+            info["prompt_tokens_after"] = estimate_tokens(
+                render(compressed), self.chars_per_token
+            )
+        return compressed, info
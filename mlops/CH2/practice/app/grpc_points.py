@@ -0,0 +1,66 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+from qdrant_client import grpc
+from qdrant_client.conversions.conversion import payload_to_grpc
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte, n = n & 0x7F, n >> 7
+        if not n:
+            out.append(byte)
+            return bytes(out)
+        out.append(byte | 0x80)
+
+
+def dense_vector(row: np.ndarray) -> grpc.Vector:
+    """Dense gRPC vector built from the row's memory, with no Python float
+    per element. DenseVector has a single field, `repeated float data = 1`,
+    which proto3 packs as one length-delimited record of little-endian
+    float32s: the serialized message is a 1-byte tag, the length and the
+    row's bytes."""
+    data = np.ascontiguousarray(row, dtype="<f4").tobytes()
+    return grpc.Vector(
+        dense=grpc.DenseVector.FromString(b"\x0a" + _varint(len(data)) + data)
+    )
+
+
+def sparse_vector(indices: np.ndarray, values: np.ndarray) -> grpc.Vector:
+    return grpc.Vector(
+        sparse=grpc.SparseVector(indices=indices.tolist(), values=values.tolist())
+    )
+
+
+def points(
+    ids: List[str],
+    dense: np.ndarray,
+    payloads: List[Dict],
+    dense_name: Optional[str] = None,
+    sparse: Optional[List] = None,
+) -> List[grpc.PointStruct]:
+    """gRPC points for upsert, taking the dense vectors as an (n, dim) matrix.
+
+    dense_name=None stores an unnamed vector; otherwise vectors are named,
+    with sparse (fastembed SparseEmbedding objects, one per row) under
+    "sparse".
+    """
+    result = []
+    for i, (pid, payload) in enumerate(zip(ids, payloads)):
+        vector = dense_vector(dense[i])
+        if dense_name is None:
+            vectors = grpc.Vectors(vector=vector)
+        else:
+            named = {dense_name: vector}
+            if sparse is not None:
+                named["sparse"] = sparse_vector(sparse[i].indices, sparse[i].values)
+            vectors = grpc.Vectors(vectors=grpc.NamedVectors(vectors=named))
+        result.append(
+            grpc.PointStruct(
+                id=grpc.PointId(uuid=pid),
+                vectors=vectors,
+                payload=payload_to_grpc(payload),
+            )
+        )
+    return result
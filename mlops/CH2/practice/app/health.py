@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    """Probes dependencies in the background and keeps the latest result.
+
+    /health reads the cached state instead of calling Qdrant and the LLM on
+    every poll. Each dependency keeps its last status, the last probe
+    latency and a rolling latency history.
+    """
+
+    def __init__(
+        self,
+        checks: Dict[str, Callable[[], Awaitable[bool]]],
+        interval: float = 5.0,
+        timeout: float = 2.0,
+        history: int = 20,
+    ):
+        self.checks = checks
+        self.interval = interval
+        self.timeout = timeout
+        self._state = {
+            name: {
+                "status": "unknown",
+                "latency_ms": None,
+                "checked_at": None,
+                "history_ms": deque(maxlen=history),
+            }
+            for name in checks
+        }
+        self._task = None
+
+    async def _probe(self, name: str) -> None:
+        start = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(self.checks[name](), timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"Health probe {name} failed: {e}")
+            ok = False
+        latency_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        state = self._state[name]
+        state["status"] = "online" if ok else "offline"
+        state["latency_ms"] = latency_ms
+        state["checked_at"] = time.time()
+        state["history_ms"].append(latency_ms)
+
+    async def probe_once(self) -> None:
+        await asyncio.gather(*(self._probe(name) for name in self.checks))
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.probe_once()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def statuses(self) -> Dict[str, str]:
+        return {name: state["status"] for name, state in self._state.items()}
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "status": state["status"],
+                "latency_ms": state["latency_ms"],
+                "checked_at": state["checked_at"],
+                "history_ms": list(state["history_ms"]),
+            }
+            for name, state in self._state.items()
+        }
@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many ingestion jobs are already waiting."""
+
+
+class IngestJobManager:
+    """Runs file ingestion in the background on a bounded worker pool.
+
+    Only `max_workers` files are processed at once (the rest wait in the
+    queue, up to `max_pending`), so big uploads cannot take every CPU away
+    from the query path. Finished jobs are kept for polling, up to `history`.
+
+    Jobs take the upload as a file on disk (see main.py); the job owns the
+    file and deletes it when processing ends, whatever the outcome.
+    """
+
+    def __init__(
+        self,
+        ingest_fn: Callable[..., int],
+        max_workers: int = 1,
+        max_pending: int = 16,
+        history: int = 100,
+    ):
+        self.ingest_fn = ingest_fn
+        self.max_pending = max_pending
+        self.history = history
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ingest"
+        )
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        # Upload files of jobs that have not started yet
+        self._paths: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, path: str, filename: str) -> Dict:
+        """Queues path for ingestion as filename. If the queue is full this
+        raises JobQueueFullError and the file stays with the caller."""
+        with self._lock:
+            pending = sum(
+                1 for job in self._jobs.values() if job["status"] in ("queued", "running")
+            )
+            if pending >= self.max_pending:
+                raise JobQueueFullError(
+                    f"Too many ingestion jobs in progress ({pending}), try again later"
+                )
+
+            now = time.time()
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "filename": filename,
+                "status": "queued",
+                "stage": "queued",
+                "processed_chunks": 0,
+                "total_chunks": 0,
+                "inserted_chunks": 0,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            self._jobs[job["job_id"]] = job
+            self._paths[job["job_id"]] = path
+            self._evict_finished()
+
+        self._executor.submit(self._run, job["job_id"], path, filename)
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        # Cancelled jobs never run, so their uploads are removed here
+        with self._lock:
+            paths = list(self._paths.values())
+            self._paths.clear()
+        for path in paths:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.error(f"Could not remove upload {path}: {e}")
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def _evict_finished(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["status"] in ("done", "failed")
+        ]
+        for job_id in finished[: max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    def _run(self, job_id: str, path: str, filename: str) -> None:
+        with self._lock:
+            if self._paths.pop(job_id, None) is None:
+                return  # Cancelled by shutdown
+        self._update(job_id, status="running", stage="extracting")
+
+        def progress(stage: str, done: int, total: int) -> None:
+            self._update(job_id, stage=stage, processed_chunks=done, total_chunks=total)
+
+        try:
+            inserted = self.ingest_fn(path, filename, progress=progress)
+            self._update(job_id, status="done", stage="done", inserted_chunks=inserted)
+        except Exception as e:
+            logger.error(f"Ingest job {job_id} ({filename}) failed: {e}")
+            self._update(job_id, status="failed", stage="failed", error=str(e))
+        finally:
+            self._remove(path)
@@ -1,17 +1,32 @@
+import json
 import logging
+import os
+import time
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from schemas import (
     AskRequest,
     AskResponse,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    DocumentDeleteResponse,
+    DocumentReplaceRequest,
+    DocumentReplaceResponse,
     IngestRequest,
     IngestResponse,
+    JobStatusResponse,
     SearchRequest,
     SearchResponse,
 )
+from health import HealthProber
+from jobs import IngestJobManager, JobQueueFullError
+from metrics import HTTP_LATENCY, HTTP_REQUESTS, register_cache
 from services import OrchestratorService, seed_database
+from uploads import UploadTooLargeError, spool_upload
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
@@ -19,22 +34,52 @@ logger = logging.getLogger("app")
 
 # Global Service
 orchestrator = None
+ingest_jobs = None
+health_prober = None
+
+# Uploads are spooled to UPLOAD_DIR (default: the system temp dir) and
+# rejected with a 413 past MAX_UPLOAD_MB (nginx allows 50M too)
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+UPLOAD_DIR = os.getenv("UPLOAD_DIR") or None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global orchestrator
+    global orchestrator, ingest_jobs, health_prober
     logger.info("Startup: Initializing Services...")
 
     # Initialize implementation
     orchestrator = OrchestratorService()
+    ingest_jobs = IngestJobManager(
+        orchestrator.process_and_ingest_file,
+        max_workers=int(os.getenv("INGEST_WORKERS", "1")),
+        max_pending=int(os.getenv("INGEST_MAX_PENDING", "16")),
+    )
+
+    register_cache("query_embeddings", orchestrator.vector_db.query_cache.stats)
+    register_cache("answers", orchestrator.answer_cache.stats)
 
     # Run Seeder
     # Note: embedder model download might happen here
     seed_database(orchestrator.vector_db)
 
+    # Dependencies are probed in the background; /health reads the cache
+    health_prober = HealthProber(
+        {
+            "vector_db": orchestrator.vector_db.acheck_health,
+            "llm": orchestrator.llm_service.acheck_health,
+        },
+        interval=float(os.getenv("HEALTH_PROBE_INTERVAL", "5")),
+        history=int(os.getenv("HEALTH_HISTORY", "20")),
+    )
+    await health_prober.probe_once()
+    health_prober.start()
+
     yield
     logger.info("Shutdown: Cleaning up...")
+    await health_prober.stop()
+    ingest_jobs.shutdown()
+    await orchestrator.aclose()
 
 
 app = FastAPI(title="Medical RAG (Edu)", version="3.0", lifespan=lifespan)
@@ -48,20 +93,47 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_requests(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (/jobs/{job_id}), not the raw URL
+        route = request.scope.get("route")
+        path = route.path if route else "unmatched"
+        HTTP_REQUESTS.labels(request.method, path, str(status)).inc()
+        HTTP_LATENCY.labels(request.method, path).observe(time.perf_counter() - start)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus exposition: stage latencies, request/error counts, tokens."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
-def health():
-    if not orchestrator:
+async def health():
+    if not health_prober:
         raise HTTPException(status_code=503, detail="Initializing")
-    
-    # Granular health check
-    health_status = orchestrator.get_health()
+
+    # Granular health check, from the background prober's last results
     return {
         "status": "ok", 
         "mode": "edu",
         "services": {
             "api": "online",
-            **health_status
-        }
+            **health_prober.statuses()
+        },
+        "probes": health_prober.snapshot(),
+        "llm_backends": orchestrator.llm_service.pool.stats(),
+        "cache": {
+            "query_embeddings": orchestrator.vector_db.query_cache.stats(),
+            "answers": orchestrator.answer_cache.stats(),
+        },
     }
 
 
@@ -70,52 +142,160 @@ def ingest(request: IngestRequest):
     try:
         count = orchestrator.vector_db.ingest(request.texts, request.source)
         return IngestResponse(
-            collection=orchestrator.vector_db.collection_name, inserted=count
+            collection=orchestrator.vector_db.collection_name,
+            inserted=count,
+            skipped=len(request.texts) - count,
         )
     except Exception as e:
         logger.error(f"Ingest failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/ingest-file")
-async def ingest_file(file: UploadFile = File(...)):
-    try:
-        content = await file.read()
-        count = orchestrator.process_and_ingest_file(content, file.filename)
-        return {
-            "filename": file.filename,
-            "inserted_chunks": count,
-            "status": "success",
+@app.post(
+    "/ingest-file",
+    response_model=JobStatusResponse,
+    status_code=202,
+    # The body is parsed by spool_upload, not FastAPI: describe it for /docs
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                }
+            },
         }
+    },
+)
+async def ingest_file(request: Request):
+    """Queues the file for background ingestion; poll GET /jobs/{job_id}.
+
+    The multipart body is streamed straight to a temporary file as it
+    arrives (see uploads.spool_upload), so the upload is never held in
+    memory nor written twice; the ingestion job reads it from there and
+    deletes it when done.
+    """
+    # A declared Content-Length over the limit is refused before any byte is
+    # read; without one, spool_upload stops reading once the limit is crossed
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File exceeds the upload limit")
+
+    path = None
+    try:
+        path, filename = await spool_upload(
+            request,
+            MAX_UPLOAD_BYTES,
+            check_filename=orchestrator.file_type,
+            directory=UPLOAD_DIR,
+        )
+        return ingest_jobs.submit(path, filename)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except JobQueueFullError as e:
+        os.remove(path)
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error(f"File ingest failed: {e}")
+        if path:
+            os.remove(path)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.delete("/documents/{source:path}", response_model=DocumentDeleteResponse)
+def delete_document(source: str):
+    """Removes every chunk stored under a source (e.g. an uploaded file name)."""
+    try:
+        deleted = orchestrator.vector_db.delete_source(source)
+    except Exception as e:
+        logger.error(f"Delete failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return DocumentDeleteResponse(source=source, deleted=deleted)
+
+
+@app.put("/documents/{source:path}", response_model=DocumentReplaceResponse)
+def replace_document(source: str, request: DocumentReplaceRequest):
+    """Replaces a source's chunks; only new or edited chunks are embedded."""
+    try:
+        counts = orchestrator.vector_db.replace_source(request.texts, source)
+        return DocumentReplaceResponse(source=source, **counts)
+    except Exception as e:
+        logger.error(f"Replace failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def get_job(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @app.post("/search", response_model=SearchResponse)
-def search(request: SearchRequest):
-    results = orchestrator.vector_db.search(request.query, request.top_k)
+async def search(request: SearchRequest):
+    results = await orchestrator.vector_db.asearch(
+        request.query, request.top_k, request.filters
+    )
     return SearchResponse(results=results)
 
 
+@app.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(request: BatchSearchRequest):
+    results = await orchestrator.vector_db.asearch_many(
+        [(q.query, q.top_k, q.filters) for q in request.queries]
+    )
+    return BatchSearchResponse(results=results)
+
+
 @app.post("/ask", response_model=AskResponse)
-def ask(request: AskRequest):
+async def ask(request: AskRequest):
     try:
-        answer, docs, debug_texts, debug_prompt = orchestrator.ask(request.question)
+        answer, docs, debug_texts, debug_prompt, meta = await orchestrator.aask(
+            request.question, request.top_k, request.filters
+        )
 
         return AskResponse(
             answer=answer,
             context=docs,
             retrieved_docs=docs,
-            built_prompt=debug_prompt
+            built_prompt=debug_prompt,
+            cache_hit=meta["cache_hit"],
+            coalesced=meta["coalesced"],
+            rerank=meta["rerank"],
+            compression=meta["compression"],
         )
     except Exception as e:
         logger.error(f"Error generation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/ask/stream")
+async def ask_stream(request: AskRequest):
+    """Server-sent events: retrieved docs first, then the answer token by token."""
+
+    async def event_stream():
+        async for event, data in orchestrator.aask_stream(
+            request.question, request.top_k, request.filters
+        ):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering (nginx) so tokens reach the client immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
 
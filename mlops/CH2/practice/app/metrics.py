@@ -0,0 +1,120 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily
+
+# Latency buckets (seconds) spanning cache hits (<1ms) to CPU LLM generations
+_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+STAGE_LATENCY = Histogram(
+    "rag_stage_duration_seconds",
+    "Latency of each RAG pipeline stage",
+    ["stage"],
+    buckets=_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "rag_stage_errors_total", "Exceptions raised inside a pipeline stage", ["stage"]
+)
+HTTP_REQUESTS = Counter(
+    "rag_http_requests_total", "HTTP requests handled", ["method", "path", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "rag_http_request_duration_seconds",
+    "End-to-end HTTP request latency",
+    ["method", "path"],
+    buckets=_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens_total", "LLM tokens reported by completion usage", ["kind"]
+)
+BATCH_SIZE = Histogram(
+    "rag_batch_size",
+    "Items per micro-batch run",
+    ["batcher"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+BATCH_WAIT = Histogram(
+    "rag_batch_wait_seconds",
+    "Time an item waited in the queue before its batch started",
+    ["batcher"],
+    buckets=_BUCKETS,
+)
+SINGLEFLIGHT = Counter(
+    "rag_singleflight_requests_total",
+    "Coalesced calls: leaders ran the work, followers shared their result",
+    ["name", "role"],
+)
+LLM_BACKEND_LATENCY = Histogram(
+    "rag_llm_backend_duration_seconds",
+    "Latency of successful calls per LLM replica",
+    ["backend"],
+    buckets=_BUCKETS,
+)
+LLM_BACKEND_OUTSTANDING = Gauge(
+    "rag_llm_backend_outstanding", "Requests in flight per LLM replica", ["backend"]
+)
+LLM_BACKEND_UP = Gauge(
+    "rag_llm_backend_up", "0 while the replica's circuit breaker is open", ["backend"]
+)
+CACHE_SIZE = Gauge("rag_cache_size", "Entries currently cached", ["cache"])
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Times a block into rag_stage_duration_seconds{stage=...}; exceptions
+    are counted in rag_stage_errors_total and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - start)
+
+
+def record_usage(usage: Optional[Dict]) -> None:
+    """Counts tokens from an OpenAI-compatible `usage` block, if present."""
+    if not usage:
+        return
+    LLM_TOKENS.labels("prompt").inc(usage.get("prompt_tokens") or 0)
+    LLM_TOKENS.labels("completion").inc(usage.get("completion_tokens") or 0)
+
+
+class _CacheEventsCollector:
+    """rag_cache_events_total{cache, result}: the caches count their own
+    hits and misses, so the counters are read from stats() at scrape time."""
+
+    def __init__(self):
+        self.caches: Dict[str, Callable[[], Dict]] = {}
+
+    def collect(self):
+        events = CounterMetricFamily(
+            "rag_cache_events",
+            "Cache lookups by result",
+            labels=["cache", "result"],
+        )
+        for name, stats in self.caches.items():
+            counts = stats()
+            events.add_metric([name, "hit"], counts["hits"])
+            events.add_metric([name, "miss"], counts["misses"])
+        yield events
+
+    def describe(self):
+        # Registers without calling collect(): the caches do not exist yet
+        return [CounterMetricFamily("rag_cache_events", "", labels=["cache", "result"])]
+
+
+_CACHE_EVENTS = _CacheEventsCollector()
+REGISTRY.register(_CACHE_EVENTS)
+
+
+def register_cache(name: str, stats: Callable[[], Dict]) -> None:
+    """Exports a cache's stats() counters, read at scrape time."""
+    _CACHE_EVENTS.caches[name] = stats
+    CACHE_SIZE.labels(name).set_function(lambda: stats()["size"])
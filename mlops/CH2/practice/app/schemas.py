@@ -1,8 +1,13 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 
 from pydantic import BaseModel
 
 
+# Payload filters: all fields must match; a list matches any of its values,
+# e.g. {"source": "Cardiologia"} or {"source": ["Cardiologia", "Neurologia"]}
+Filters = Dict[str, Union[str, int, bool, List[Union[str, int]]]]
+
+
 class IngestRequest(BaseModel):
     texts: List[str]
     source: str = "user_upload"
@@ -11,20 +16,47 @@ class IngestRequest(BaseModel):
 class IngestResponse(BaseModel):
     collection: str
     inserted: int
+    skipped: int = 0  # Chunks already stored (same source and text)
+
+
+class DocumentReplaceRequest(BaseModel):
+    texts: List[str]  # The document's chunks after the change
+
+
+class DocumentReplaceResponse(BaseModel):
+    source: str
+    inserted: int  # New or edited chunks (embedded)
+    kept: int      # Unchanged chunks (not re-embedded)
+    deleted: int   # Chunks no longer in the document
+
+
+class DocumentDeleteResponse(BaseModel):
+    source: str
+    deleted: int
 
 
 class SearchRequest(BaseModel):
     query: str
     top_k: int = 3
+    filters: Optional[Filters] = None
 
 
 class SearchResponse(BaseModel):
     results: List[Dict]
 
 
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchRequest]
+
+
+class BatchSearchResponse(BaseModel):
+    results: List[List[Dict]]  # One result list per query, same order
+
+
 class AskRequest(BaseModel):
     question: str
     top_k: int = 3
+    filters: Optional[Filters] = None
 
 
 class AskResponse(BaseModel):
@@ -33,3 +65,20 @@ class AskResponse(BaseModel):
     # Educational fields
     retrieved_docs: List[Dict] # Rich list of docs with scores
     built_prompt: str         # The exact prompt sent to LLM
+    cache_hit: bool = False   # Answer reused from the semantic cache
+    coalesced: bool = False   # Shared the generation of an identical in-flight request
+    rerank: Optional[Dict] = None  # Cross-encoder stage report (when enabled)
+    compression: Optional[Dict] = None  # Context/prompt tokens before/after (when enabled)
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: str               # queued | running | done | failed
+    stage: str                # queued | extracting | embedding | done | failed
+    processed_chunks: int
+    total_chunks: int
+    inserted_chunks: int
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
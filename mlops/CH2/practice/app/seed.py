@@ -0,0 +1,84 @@
+"""Precomputed seed vectors.
+
+Startup seeding used to embed all of MEDICAL_DATA on a fresh Qdrant. The
+dense vectors are now computed once, at image build time, and stored with
+their payloads in a compressed .npz file:
+
+    python seed.py [path]
+
+The file carries a fingerprint of the embedding model, vector size and seed
+data. seed_database() bulk-upserts it when the fingerprint matches and falls
+back to live embedding otherwise (model or data changed, file missing).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_vectors.npz")
+
+
+def seed_fingerprint(
+    model_name: str, vector_size: int, records: List[Tuple[str, str]]
+) -> str:
+    """Identifies the (model, size, seed data) a set of vectors was built from."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([model_name, vector_size]).encode())
+    for text, source in records:
+        digest.update(f"{source}\x00{text}\x01".encode())
+    return digest.hexdigest()
+
+
+def save_seed_artifact(
+    path: str, fingerprint: str, records: List[Tuple[str, str]], vectors: np.ndarray
+) -> None:
+    np.savez_compressed(
+        path,
+        fingerprint=np.array(fingerprint),
+        texts=np.array([text for text, _ in records]),
+        sources=np.array([source for _, source in records]),
+        vectors=vectors.astype(np.float32),
+    )
+
+
+def load_seed_artifact(path: str, fingerprint: str) -> Optional[np.ndarray]:
+    """Returns the stored vectors, or None if the file is missing or was built
+    for a different model or seed data."""
+    if not os.path.exists(path):
+        logger.info(f"No seed artifact at {path}")
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["fingerprint"]) != fingerprint:
+                logger.warning(f"Seed artifact {path} is stale (fingerprint mismatch)")
+                return None
+            return data["vectors"]
+    except Exception as e:
+        logger.warning(f"Could not read seed artifact {path}: {e}")
+        return None
+
+
+def main() -> None:
+    from fastembed import TextEmbedding
+
+    from services import EMBED_MODEL, VECTOR_SIZE, seed_records
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    records = seed_records()
+    embedder = TextEmbedding(model_name=EMBED_MODEL)
+    vectors = np.stack(list(embedder.embed([text for text, _ in records])))
+    save_seed_artifact(
+        path, seed_fingerprint(EMBED_MODEL, VECTOR_SIZE, records), records, vectors
+    )
+    print(f"Wrote {len(records)} seed vectors to {path}")
+
+
+if __name__ == "__main__":
+    main()
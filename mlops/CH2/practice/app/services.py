@@ -1,61 +1,239 @@
+import asyncio
+import functools
+import hashlib
 import io
+import itertools
+import json
 import logging
+import multiprocessing
 import os
+import threading
+import time
 import uuid
-from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import (
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import docx
+import httpx
+import numpy as np
 import pypdf
 import pytesseract
-import requests
-from fastembed import TextEmbedding
+from fastembed import SparseTextEmbedding, TextEmbedding
+from fastembed.rerank.cross_encoder import TextCrossEncoder
 from PIL import Image
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http import models as qmodels
 
+import grpc_points
+from backends import BackendPool
+from batching import MicroBatcher
+from cache import EmbeddingCache, SemanticAnswerCache, normalize_query
+from coalesce import SingleFlight
+from compression import ContextCompressor, format_context
+from metrics import record_usage, stage_timer
+from seed import DEFAULT_PATH as SEED_ARTIFACT_PATH
+from seed import load_seed_artifact, seed_fingerprint
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EMBED_MODEL = "BAAI/bge-small-en-v1.5"
+VECTOR_SIZE = 384
+
+# Payload filter value: exact match, or any of a list
+FilterValue = Union[str, int, bool, List[Union[str, int]]]
+
 
 class DocumentProcessor:
+    # Per-document limits for PDF extraction
+    pdf_max_pages = int(os.getenv("PDF_MAX_PAGES", "500"))
+    pdf_time_limit = float(os.getenv("PDF_TIME_LIMIT", "120"))
+    pdf_pages_per_task = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+    _pdf_pool = None
+    _pdf_pool_lock = threading.Lock()
+
+    @classmethod
+    def _get_pdf_pool(cls) -> ProcessPoolExecutor:
+        with cls._pdf_pool_lock:
+            if cls._pdf_pool is None:
+                # Half the cores by default, so extraction leaves CPU for the
+                # query path (embedding, search) while a big PDF is ingested.
+                # spawn: forking a process that already runs ONNX/HTTP threads is unsafe
+                default_workers = max(1, (os.cpu_count() or 2) // 2)
+                cls._pdf_pool = ProcessPoolExecutor(
+                    max_workers=int(os.getenv("PDF_WORKERS", str(default_workers))),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return cls._pdf_pool
+
+    @classmethod
+    def _reset_pdf_pool(cls, broken: ProcessPoolExecutor) -> None:
+        # A pool whose worker died (e.g. OOM-killed during OCR) rejects every
+        # later task; drop it so the next _get_pdf_pool() starts a new one
+        with cls._pdf_pool_lock:
+            if cls._pdf_pool is broken:
+                cls._pdf_pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
     @staticmethod
-    def process_pdf(file_content: bytes) -> str:
+    def _extract_pdf_pages(
+        path: str, start: int, end: int, deadline: Optional[float] = None
+    ) -> List[str]:
+        """Text of pages [start, end). Pages without a text layer (scans) are
+        sent through OCR using their embedded images. Runs in a worker process,
+        which opens the file itself: only the path crosses the process boundary.
+
+        Stops before the first page started after deadline (a time.time()
+        timestamp) and returns the pages done so far, so a document past its
+        time limit does not keep the worker busy.
+        """
+        texts = []
+        # An open file (not the path) keeps pypdf from reading it all into memory
+        with open(path, "rb") as f:
+            pdf_reader = pypdf.PdfReader(f)
+            for number in range(start, end):
+                if deadline is not None and time.time() >= deadline:
+                    break
+                page = pdf_reader.pages[number]
+                text = page.extract_text() or ""
+                if not text.strip():
+                    try:
+                        text = "\n".join(
+                            DocumentProcessor.process_image(io.BytesIO(image.data))
+                            for image in page.images
+                        )
+                    except Exception as e:
+                        logger.error(
+                            f"Error extracting images from PDF page {number}: {e}"
+                        )
+                texts.append(text)
+        return texts
+
+    @classmethod
+    def process_pdf(cls, path: str) -> str:
         try:
-            pdf_reader = pypdf.PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            with open(path, "rb") as f:
+                num_pages = len(pypdf.PdfReader(f).pages)
+            if num_pages > cls.pdf_max_pages:
+                logger.warning(
+                    f"PDF has {num_pages} pages, extracting the first {cls.pdf_max_pages}"
+                )
+                num_pages = cls.pdf_max_pages
+
+            # Workers check the deadline before every page, so the limit bounds
+            # the work itself, not only how long this call waits for it
+            deadline = time.time() + cls.pdf_time_limit
+            ranges = [
+                (start, min(start + cls.pdf_pages_per_task, num_pages))
+                for start in range(0, num_pages, cls.pdf_pages_per_task)
+            ]
+            if len(ranges) <= 1:
+                # Small file: not worth a round trip to the process pool
+                pages = cls._extract_pdf_pages(path, 0, num_pages, deadline)
+            else:
+                try:
+                    pages = cls._extract_pdf_ranges(path, ranges, deadline)
+                except BrokenProcessPool:
+                    logger.warning("PDF worker pool broke, retrying on a new pool")
+                    pages = cls._extract_pdf_ranges(path, ranges, deadline)
+
+            if len(pages) < num_pages:
+                logger.warning(
+                    f"PDF time limit ({cls.pdf_time_limit}s) reached: "
+                    f"extracted {len(pages)} of {num_pages} pages"
+                )
+            return "\n".join(pages)
+        except BrokenProcessPool as e:
+            # Failing the job beats reporting an empty document as ingested
+            logger.error(f"Error processing PDF: worker pool broke twice: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error processing PDF: {e}")
             return ""
 
+    @classmethod
+    def _extract_pdf_ranges(
+        cls, path: str, ranges: List[Tuple[int, int]], deadline: float
+    ) -> List[str]:
+        """Pages of every (start, end) range, extracted on the process pool.
+        Raises BrokenProcessPool (after resetting the pool) if a worker died."""
+        pool = cls._get_pdf_pool()
+        try:
+            futures = [
+                pool.submit(cls._extract_pdf_pages, path, start, end, deadline)
+                for start, end in ranges
+            ]
+            # A range running at the deadline stops after its current page
+            done, not_done = wait(futures, timeout=cls.pdf_time_limit)
+            for future in not_done:
+                future.cancel()
+
+            # Join once, in page order; a range cut short keeps its first pages
+            pages = []
+            for (start, end), future in zip(ranges, futures):
+                if future not in done:
+                    continue
+                try:
+                    pages.extend(future.result())
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error processing PDF pages {start}-{end}: {e}")
+                    pages.extend([""] * (end - start))
+            return pages
+        except BrokenProcessPool:
+            cls._reset_pdf_pool(pool)
+            raise
+
     @staticmethod
-    def process_docx(file_content: bytes) -> str:
+    def process_docx(file: Union[str, BinaryIO]) -> str:
         try:
-            doc = docx.Document(io.BytesIO(file_content))
+            doc = docx.Document(file)
             return "\n".join([para.text for para in doc.paragraphs])
         except Exception as e:
             logger.error(f"Error processing DOCX: {e}")
             return ""
 
     @staticmethod
-    def process_image(file_content: bytes) -> str:
+    def process_image(file: Union[str, BinaryIO]) -> str:
         try:
-            image = Image.open(io.BytesIO(file_content))
-            return pytesseract.image_to_string(image)
+            with Image.open(file) as image:
+                return pytesseract.image_to_string(image)
         except Exception as e:
             logger.error(f"Error processing Image: {e}")
             return ""
 
     @staticmethod
-    def process_txt(file_content: bytes) -> str:
+    def process_txt(path: str) -> Iterator[str]:
+        """Paragraphs (blocks separated by blank lines) of a UTF-8 text file,
+        read line by line so only the current paragraph is in memory."""
         try:
-            return file_content.decode("utf-8")
+            with open(path, encoding="utf-8") as f:
+                paragraph = []
+                for line in f:
+                    if line.strip():
+                        paragraph.append(line)
+                    elif paragraph:
+                        yield "".join(paragraph).strip()
+                        paragraph = []
+                if paragraph:
+                    yield "".join(paragraph).strip()
         except Exception as e:
             logger.error(f"Error processing TXT: {e}")
-            return ""
 
 
 class VectorDbService:
@@ -63,187 +241,1120 @@ class VectorDbService:
         self.collection_name = os.getenv("QDRANT_COLLECTION", "workshop_docs")
         qdrant_host = os.getenv("QDRANT_HOST", "qdrant")
         qdrant_port = int(os.getenv("QDRANT_PORT", "6333"))
+        # gRPC transport: vectors travel as packed float32 protobuf instead of
+        # JSON, and ingest builds the points straight from numpy arrays
+        self.prefer_grpc = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+        grpc_port = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
 
         logger.info("Loading FastEmbed model...")
-        self.embedder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+        self.embedder = TextEmbedding(model_name=EMBED_MODEL)
+
+        # Hybrid retrieval: a sparse (BM25) vector next to the dense one, so
+        # exact terms like "DPOC", "AVC" or "HIV" still match. Both are
+        # queried in one call and fused with reciprocal rank fusion (RRF).
+        self.hybrid = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+        self.hybrid_candidates = int(os.getenv("HYBRID_CANDIDATES", "20"))
+        self.sparse_embedder = None
+        if self.hybrid:
+            sparse_model = os.getenv("SPARSE_MODEL", "Qdrant/bm25")
+            logger.info(f"Loading sparse model {sparse_model}...")
+            sparse_kwargs = {}
+            if "bm25" in sparse_model.lower():
+                # Stemmer and stopwords for the corpus language
+                sparse_kwargs["language"] = os.getenv("SPARSE_LANGUAGE", "portuguese")
+            self.sparse_embedder = SparseTextEmbedding(
+                model_name=sparse_model, **sparse_kwargs
+            )
+        # Dense vector name in the collection (None: legacy unnamed vector)
+        self.dense_name = "dense" if self.hybrid else None
+        self._layout_checked = False
+        # Keyword payload indexes, so filtered searches use filtered HNSW
+        # instead of checking every candidate's payload
+        self.indexed_fields = [
+            f.strip()
+            for f in os.getenv("QDRANT_INDEXED_FIELDS", "source").split(",")
+            if f.strip()
+        ]
+
+        qdrant_path = os.getenv("QDRANT_PATH")
+        if qdrant_path:
+            # Qdrant local mode (":memory:" or a directory), e.g. for benchmarks
+            logger.info(f"Using Qdrant local mode: {qdrant_path}")
+            if qdrant_path == ":memory:":
+                self.qdrant = QdrantClient(location=":memory:")
+            else:
+                self.qdrant = QdrantClient(
+                    path=qdrant_path, force_disable_check_same_thread=True
+                )
+            # Local storage belongs to one client: async calls reuse it in a thread
+            self.aqdrant = None
+            self.prefer_grpc = False
+        else:
+            transport = f"gRPC :{grpc_port}" if self.prefer_grpc else "REST"
+            logger.info(f"Connecting to Qdrant: {qdrant_host}:{qdrant_port} ({transport})")
+            client_kwargs = dict(
+                host=qdrant_host,
+                port=qdrant_port,
+                grpc_port=grpc_port,
+                prefer_grpc=self.prefer_grpc,
+            )
+            self.qdrant = QdrantClient(**client_kwargs)
+            # Request path (async endpoints) uses its own non-blocking client
+            self.aqdrant = AsyncQdrantClient(**client_kwargs)
+        self.vector_size = VECTOR_SIZE
+
+        # Vector storage: QDRANT_QUANTIZATION = none | scalar (int8) | binary.
+        # Quantized vectors stay in RAM; originals can move to disk and are
+        # only read to rescore the oversampled candidates.
+        self.quantization = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+        self.vectors_on_disk = os.getenv("QDRANT_ON_DISK", "false").lower() == "true"
+        self.search_params = None
+        if self.quantization != "none":
+            self.search_params = qmodels.SearchParams(
+                quantization=qmodels.QuantizationSearchParams(
+                    rescore=os.getenv("QDRANT_RESCORE", "true").lower() == "true",
+                    oversampling=float(os.getenv("QDRANT_OVERSAMPLING", "2.0")),
+                )
+            )
+
+        # Bumped on every write so answer caches built on older data expire
+        self.generation = 0
 
-        logger.info(f"Connecting to Qdrant: {qdrant_host}:{qdrant_port}")
-        self.qdrant = QdrantClient(host=qdrant_host, port=qdrant_port)
-        self.vector_size = 384
+        # Sparse (BM25) query encoding is CPU-bound too: keep it off the event
+        # loop, in a small dedicated pool instead of the shared FastAPI one
+        self._embed_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("EMBED_WORKERS", "2")),
+            thread_name_prefix="embed",
+        )
+        # Dense query embeddings from concurrent requests share model calls:
+        # misses arriving within the window are embedded as one batch
+        self.query_batcher = MicroBatcher(
+            self._embed_query_batch,
+            max_batch=int(os.getenv("EMBED_BATCH_MAX", "32")),
+            window_ms=float(os.getenv("EMBED_BATCH_WINDOW_MS", "5")),
+            name="embed",
+        )
+        # Ingest overlaps embedding of one batch with the upsert of the previous
+        self.ingest_batch_size = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+        self._upsert_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="upsert"
+        )
+
+        # Repeated questions skip the embedder entirely
+        self.query_cache = EmbeddingCache(
+            max_size=int(os.getenv("EMBED_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("EMBED_CACHE_TTL", "3600")),
+        )
+
+    def _quantization_config(self) -> Optional[qmodels.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return qmodels.ScalarQuantization(
+                scalar=qmodels.ScalarQuantizationConfig(
+                    type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.quantization == "binary":
+            return qmodels.BinaryQuantization(
+                binary=qmodels.BinaryQuantizationConfig(always_ram=True)
+            )
+        if self.quantization != "none":
+            logger.warning(f"Unknown QDRANT_QUANTIZATION={self.quantization}, ignoring")
+        return None
+
+    def _detect_layout(self) -> None:
+        """Adapts to an existing collection created with other settings."""
+        params = self.qdrant.get_collection(self.collection_name).config.params
+        self.dense_name = "dense" if isinstance(params.vectors, dict) else None
+        if self.hybrid and "sparse" not in (params.sparse_vectors or {}):
+            logger.warning(
+                f"Collection {self.collection_name} has no sparse vector: hybrid "
+                "search disabled (recreate the collection to enable it)"
+            )
+            self.hybrid = False
+        self._ensure_payload_indexes()
+        self._layout_checked = True
+
+    def _ensure_payload_indexes(self) -> None:
+        if self.aqdrant is None:
+            # Local mode scans payloads anyway and does not support indexes
+            return
+        existing = self.qdrant.get_collection(self.collection_name).payload_schema or {}
+        for field in self.indexed_fields:
+            if field in existing:
+                continue
+            logger.info(f"Creating payload index on {field}")
+            self.qdrant.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field,
+                field_schema=qmodels.PayloadSchemaType.KEYWORD,
+            )
 
     def ensure_collection(self) -> None:
         try:
             if not self.qdrant.collection_exists(self.collection_name):
-                logger.info(f"Creating collection: {self.collection_name}")
+                logger.info(
+                    f"Creating collection: {self.collection_name} "
+                    f"(hybrid={self.hybrid}, quantization={self.quantization}, "
+                    f"on_disk={self.vectors_on_disk})"
+                )
+                dense_params = qmodels.VectorParams(
+                    size=self.vector_size,
+                    distance=qmodels.Distance.COSINE,
+                    on_disk=self.vectors_on_disk,
+                )
                 self.qdrant.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=qmodels.VectorParams(
-                        size=self.vector_size,
-                        distance=qmodels.Distance.COSINE,
-                    ),
+                    vectors_config={"dense": dense_params} if self.hybrid else dense_params,
+                    sparse_vectors_config={
+                        # IDF is computed by Qdrant over the whole collection
+                        "sparse": qmodels.SparseVectorParams(
+                            modifier=qmodels.Modifier.IDF
+                        )
+                    }
+                    if self.hybrid
+                    else None,
+                    quantization_config=self._quantization_config(),
                 )
+                self.dense_name = "dense" if self.hybrid else None
+                self._ensure_payload_indexes()
+                self._layout_checked = True
+            elif not self._layout_checked:
+                self._detect_layout()
         except Exception as e:
             logger.error(f"Error ensuring collection: {e}")
 
-    def check_health(self) -> bool:
+    async def acheck_health(self) -> bool:
         try:
-            # Lightweight check: get collection info
-            self.qdrant.get_collection(self.collection_name)
+            await self._aqdrant_call(
+                "get_collection", collection_name=self.collection_name
+            )
             return True
         except Exception:
             return False
 
-    def ingest(self, texts: List[str], source: str) -> int:
+    @staticmethod
+    def point_id(source: str, text: str) -> str:
+        """Content-addressed id: the same chunk of the same source always maps
+        to the same point, so re-uploads overwrite instead of duplicating."""
+        digest = hashlib.sha256(f"{source}\x00{text}".encode("utf-8")).hexdigest()
+        return str(uuid.UUID(digest[:32]))
+
+    def _existing_ids(self, ids: List[str], batch_size: int = 256) -> set:
+        existing = set()
+        for start in range(0, len(ids), batch_size):
+            points = self.qdrant.retrieve(
+                collection_name=self.collection_name,
+                ids=ids[start : start + batch_size],
+                with_payload=False,
+                with_vectors=False,
+            )
+            existing.update(str(point.id) for point in points)
+        return existing
+
+    def _new_chunks(
+        self, texts: List[str], source: str, in_flight: set
+    ) -> List[Tuple[str, str]]:
+        """(id, text) pairs not stored yet: deduped, minus ids already in the
+        collection or in the batch still being upserted."""
+        chunks = {}
+        for text in texts:
+            chunks.setdefault(self.point_id(source, text), text)
+        candidates = [pid for pid in chunks if pid not in in_flight]
+        existing = self._existing_ids(candidates)
+        return [(pid, chunks[pid]) for pid in candidates if pid not in existing]
+
+    def ingest(
+        self,
+        texts: Iterable[str],
+        source: str,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """Stores new chunks and returns how many were inserted. Chunks already
+        in the collection (same source and text) are not embedded again.
+
+        Texts are consumed in batches of INGEST_BATCH_SIZE: batch N+1 is
+        embedded while batch N is being upserted, so at most two batches are
+        in memory regardless of input size (texts may be a generator).
+        progress(done, total) is called after each stored batch; total is 0
+        when the input has no length.
+        """
         self.ensure_collection()
-        if not texts:
-            return 0
+        total = len(texts) if hasattr(texts, "__len__") else 0
+        iterator = iter(texts)
+
+        inserted = 0
+        done = 0
+        pending = None  # (future, ids, batch_len) of the upsert in flight
+
+        def finish(upsert):
+            nonlocal inserted, done
+            future, ids, batch_len = upsert
+            future.result()
+            if ids:
+                inserted += len(ids)
+                self.generation += 1
+            done += batch_len
+            if progress:
+                progress(done, total)
 
-        embeddings = list(self.embedder.embed(texts))
+        while True:
+            batch = list(itertools.islice(iterator, self.ingest_batch_size))
+            if not batch:
+                break
 
-        points = [
-            qmodels.PointStruct(
-                id=str(uuid.uuid4()),
-                vector=emb.tolist(),
-                payload={"text": text, "source": source},
+            new_chunks = self._new_chunks(
+                batch, source, in_flight=pending[1] if pending else set()
             )
-            for text, emb in zip(texts, embeddings)
-        ]
+            points = []
+            if new_chunks:
+                ids = [pid for pid, _ in new_chunks]
+                texts_batch = [text for _, text in new_chunks]
+                with stage_timer("ingest_embed"):
+                    dense = self._embed_documents(texts_batch)
+                points = self._points(ids, texts_batch, source, dense)
 
-        self.qdrant.upsert(collection_name=self.collection_name, points=points)
-        return len(points)
+            if pending:
+                finish(pending)
+            if points:
+                future = self._upsert_executor.submit(self._upsert, points)
+            else:
+                future = self._upsert_executor.submit(lambda: None)
+            pending = (future, {pid for pid, _ in new_chunks}, len(batch))
 
-    def search(self, query: str, top_k: int) -> List[Dict]:
-        query_vector = list(self.embedder.embed([query]))[0].tolist()
+        if pending:
+            finish(pending)
 
-        try:
-            if hasattr(self.qdrant, "query_points"):
-                hits = self.qdrant.query_points(
-                    collection_name=self.collection_name,
-                    query=query_vector,
-                    limit=top_k,
-                    with_payload=True,
-                ).points
-            elif hasattr(self.qdrant, "search"):
-                hits = self.qdrant.search(
+        skipped = done - inserted
+        if skipped:
+            logger.info(f"Skipped {skipped} chunks already stored for {source}")
+        return inserted
+
+    def _upsert(self, points: List) -> None:
+        with stage_timer("ingest_upsert"):
+            self.qdrant.upsert(collection_name=self.collection_name, points=points)
+
+    def ingest_vectors(self, texts: List[str], dense, source: str) -> int:
+        """Stores chunks whose dense vectors were computed ahead of time (e.g.
+        the seed artifact). Sparse vectors, if any, are still computed here."""
+        self.ensure_collection()
+        for start in range(0, len(texts), self.ingest_batch_size):
+            batch = texts[start:start + self.ingest_batch_size]
+            ids = [self.point_id(source, text) for text in batch]
+            self._upsert(
+                self._points(ids, batch, source, dense[start:start + len(batch)])
+            )
+        if texts:
+            self.generation += 1
+        return len(texts)
+
+    @staticmethod
+    def _source_filter(source: str) -> qmodels.Filter:
+        return qmodels.Filter(
+            must=[
+                qmodels.FieldCondition(
+                    key="source", match=qmodels.MatchValue(value=source)
+                )
+            ]
+        )
+
+    def _source_ids(self, source: str, page_size: int = 1024) -> set:
+        """Ids of every chunk stored for a source (ids only, no payload)."""
+        ids, offset = set(), None
+        while True:
+            points, offset = self.qdrant.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._source_filter(source),
+                limit=page_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            ids.update(str(point.id) for point in points)
+            if offset is None:
+                return ids
+
+    def delete_source(self, source: str) -> int:
+        """Deletes every chunk of a source with one filtered delete (served by
+        the source payload index); returns how many were removed."""
+        self.ensure_collection()
+        count = self.qdrant.count(
+            collection_name=self.collection_name,
+            count_filter=self._source_filter(source),
+            exact=True,
+        ).count
+        if count:
+            self.qdrant.delete(
+                collection_name=self.collection_name,
+                points_selector=qmodels.FilterSelector(
+                    filter=self._source_filter(source)
+                ),
+                wait=True,
+            )
+            self.generation += 1
+        return count
+
+    def replace_source(self, texts: List[str], source: str) -> Dict[str, int]:
+        """Makes texts the only chunks of source. Point ids are derived from
+        (source, text), so unchanged chunks keep their id and vector; only new
+        or edited chunks are embedded. The upsert of new chunks and the delete
+        of stale ones go in one batch_update_points call, applied in order, so
+        searches never see the source missing.
+
+        Returns {"inserted", "kept", "deleted"} chunk counts.
+        """
+        self.ensure_collection()
+        chunks = {}
+        for text in texts:
+            chunks.setdefault(self.point_id(source, text), text)
+        stored = self._source_ids(source)
+
+        new_ids = [pid for pid in chunks if pid not in stored]
+        stale_ids = [pid for pid in stored if pid not in chunks]
+
+        points = []
+        for start in range(0, len(new_ids), self.ingest_batch_size):
+            batch = new_ids[start:start + self.ingest_batch_size]
+            texts_batch = [chunks[pid] for pid in batch]
+            with stage_timer("ingest_embed"):
+                dense = self._embed_documents(texts_batch)
+            # batch_update_points only takes REST models, even over gRPC
+            points.extend(self._points(batch, texts_batch, source, dense, rest=True))
+
+        operations = []
+        if points:
+            operations.append(
+                qmodels.UpsertOperation(upsert=qmodels.PointsList(points=points))
+            )
+        if stale_ids:
+            operations.append(
+                qmodels.DeleteOperation(
+                    delete=qmodels.PointIdsList(points=stale_ids)
+                )
+            )
+        if operations:
+            with stage_timer("ingest_upsert"):
+                self.qdrant.batch_update_points(
                     collection_name=self.collection_name,
-                    query_vector=query_vector,
-                    limit=top_k,
-                    with_payload=True,
+                    update_operations=operations,
+                    wait=True,
                 )
-            else:
-                # HTTP Fallback
-                url = f"{self.qdrant.rest_uri}/collections/{self.collection_name}/points/search"
-                resp = requests.post(
-                    url,
-                    json={"vector": query_vector, "limit": top_k, "with_payload": True},
+            self.generation += 1
+
+        return {
+            "inserted": len(new_ids),
+            "kept": len(chunks) - len(new_ids),
+            "deleted": len(stale_ids),
+        }
+
+    def _embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Dense embeddings as one (len(texts), VECTOR_SIZE) float32 matrix."""
+        return np.stack(list(self.embedder.embed(texts))).astype(np.float32, copy=False)
+
+    def _points(
+        self,
+        ids: List[str],
+        texts: List[str],
+        source: str,
+        dense: np.ndarray,
+        rest: bool = False,
+    ) -> List:
+        """Points in the collection's layout (dense, plus sparse if hybrid).
+
+        Over gRPC they are built as protobuf straight from the dense matrix;
+        otherwise (or with rest=True) the matrix becomes lists once per batch.
+        """
+        payloads = [{"text": text, "source": source} for text in texts]
+        sparse = list(self.sparse_embedder.embed(texts)) if self.hybrid else None
+        if self.prefer_grpc and not rest:
+            return grpc_points.points(ids, dense, payloads, self.dense_name, sparse)
+
+        vectors = dense.tolist()
+        if self.dense_name is not None:
+            vectors = [{self.dense_name: vector} for vector in vectors]
+        if sparse is not None:
+            for vector, emb in zip(vectors, sparse):
+                vector["sparse"] = qmodels.SparseVector(
+                    indices=emb.indices.tolist(), values=emb.values.tolist()
                 )
-                resp.raise_for_status()
-                hits = []
+        return [
+            qmodels.PointStruct(id=pid, vector=vector, payload=payload)
+            for pid, vector, payload in zip(ids, vectors, payloads)
+        ]
 
-            return [
-                {
-                    "text": hit.payload.get("text", ""),
-                    "source": hit.payload.get("source", "unknown"),
-                    "score": float(hit.score),
-                }
-                for hit in hits
+    def sparse_queries(self, queries: List[str]) -> List[Optional[qmodels.SparseVector]]:
+        if not self.hybrid:
+            return [None] * len(queries)
+        return [
+            qmodels.SparseVector(indices=emb.indices.tolist(), values=emb.values.tolist())
+            for emb in self.sparse_embedder.query_embed(queries)
+        ]
+
+    def _embed_query_batch(self, keys: List[str]) -> List[List[float]]:
+        """Batcher callback: one model pass for the queued (normalized) queries."""
+        unique = list(dict.fromkeys(keys))
+        with stage_timer("embed"):
+            embeddings = [emb.tolist() for emb in self.embedder.embed(unique)]
+        vectors = dict(zip(unique, embeddings))
+        for key, vector in vectors.items():
+            self.query_cache.put(key, vector)
+        return [vectors[key] for key in keys]
+
+    def _cached_queries(self, queries: List[str]) -> Tuple[List[str], Dict, List[str]]:
+        """Returns (keys, cached vectors by key, keys still to embed)."""
+        keys = [normalize_query(q) for q in queries]
+        vectors = {key: self.query_cache.get(key) for key in set(keys)}
+        missing = [key for key, vector in vectors.items() if vector is None]
+        return keys, vectors, missing
+
+    @staticmethod
+    def _build_filter(
+        filters: Optional[Dict[str, FilterValue]]
+    ) -> Optional[qmodels.Filter]:
+        # All fields must match: a value is an exact match, e.g.
+        # {"source": "Cardiologia"}, a list matches any of its values,
+        # e.g. {"source": ["Cardiologia", "Neurologia"]}
+        if not filters:
+            return None
+        return qmodels.Filter(
+            must=[
+                qmodels.FieldCondition(
+                    key=key,
+                    match=qmodels.MatchAny(any=value)
+                    if isinstance(value, list)
+                    else qmodels.MatchValue(value=value),
+                )
+                for key, value in filters.items()
             ]
+        )
+
+    @staticmethod
+    def _to_docs(hits, fused: bool = False) -> List[Dict]:
+        # score_type tells clients how to read score: cosine similarity, or
+        # an RRF rank-fusion value (hybrid) that is not a percentage
+        return [
+            {
+                "id": str(hit.id),
+                "text": hit.payload.get("text", ""),
+                "source": hit.payload.get("source", "unknown"),
+                "score": float(hit.score),
+                "score_type": "rrf" if fused else "cosine",
+            }
+            for hit in hits
+        ]
+
+    def _query_request(
+        self,
+        query_vector: List[float],
+        sparse_vector: Optional[qmodels.SparseVector],
+        top_k: int,
+        filters: Optional[Dict[str, FilterValue]] = None,
+    ) -> qmodels.QueryRequest:
+        query_filter = self._build_filter(filters)
+        if sparse_vector is None:
+            return qmodels.QueryRequest(
+                query=query_vector,
+                using=self.dense_name,
+                filter=query_filter,
+                params=self.search_params,
+                limit=top_k,
+                with_payload=True,
+            )
+
+        # Hybrid: both candidate lists are fetched server-side, then fused by rank
+        candidates = max(self.hybrid_candidates, top_k)
+        return qmodels.QueryRequest(
+            prefetch=[
+                qmodels.Prefetch(
+                    query=query_vector,
+                    using=self.dense_name,
+                    filter=query_filter,
+                    params=self.search_params,
+                    limit=candidates,
+                ),
+                qmodels.Prefetch(
+                    query=sparse_vector,
+                    using="sparse",
+                    filter=query_filter,
+                    limit=candidates,
+                ),
+            ],
+            query=qmodels.FusionQuery(fusion=qmodels.Fusion.RRF),
+            limit=top_k,
+            with_payload=True,
+        )
+
+    async def _aqdrant_call(self, method: str, **kwargs):
+        """Calls the async client, or the local-mode client in a thread."""
+        if self.aqdrant is not None:
+            return await getattr(self.aqdrant, method)(**kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(getattr(self.qdrant, method), **kwargs)
+        )
+
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        # Cache lookups are cheap; only misses wait on the batcher thread
+        keys, vectors, missing = self._cached_queries(queries)
+        results = await asyncio.gather(
+            *(asyncio.wrap_future(self.query_batcher.submit(key)) for key in missing)
+        )
+        vectors.update(zip(missing, results))
+        return [vectors[key] for key in keys]
+
+    async def asparse_queries(
+        self, queries: List[str]
+    ) -> List[Optional[qmodels.SparseVector]]:
+        if not self.hybrid:
+            return [None] * len(queries)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._embed_executor, self.sparse_queries, queries
+        )
+
+    async def asearch(
+        self, query: str, top_k: int, filters: Optional[Dict[str, FilterValue]] = None
+    ) -> List[Dict]:
+        query_vector = (await self.aembed_queries([query]))[0]
+        return await self.asearch_by_vector(query_vector, top_k, filters, query=query)
+
+    async def asearch_by_vector(
+        self,
+        query_vector: List[float],
+        top_k: int,
+        filters: Optional[Dict[str, FilterValue]] = None,
+        query: Optional[str] = None,
+    ) -> List[Dict]:
+        """Search with an already computed dense vector. Pass the query text
+        too so hybrid mode can add its sparse side."""
+        sparse_vector = (await self.asparse_queries([query]))[0] if query else None
+
+        try:
+            with stage_timer("qdrant_search"):
+                responses = await self._aqdrant_call(
+                    "query_batch_points",
+                    collection_name=self.collection_name,
+                    requests=[
+                        self._query_request(query_vector, sparse_vector, top_k, filters)
+                    ],
+                )
+            return self._to_docs(responses[0].points, fused=sparse_vector is not None)
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
 
+    async def asearch_many(
+        self, searches: List[Tuple[str, int, Optional[Dict[str, FilterValue]]]]
+    ) -> List[List[Dict]]:
+        """Runs several (query, top_k, filters) searches with a single embedding
+        pass and a single Qdrant round trip. Results keep the input order."""
+        if not searches:
+            return []
+
+        queries = [query for query, _, _ in searches]
+        query_vectors = await self.aembed_queries(queries)
+        sparse_vectors = await self.asparse_queries(queries)
+
+        try:
+            with stage_timer("qdrant_search"):
+                responses = await self._aqdrant_call(
+                    "query_batch_points",
+                    collection_name=self.collection_name,
+                    requests=[
+                        self._query_request(vector, sparse, top_k, filters)
+                        for vector, sparse, (_, top_k, filters) in zip(
+                            query_vectors, sparse_vectors, searches
+                        )
+                    ],
+                )
+            return [
+                self._to_docs(response.points, fused=sparse is not None)
+                for response, sparse in zip(responses, sparse_vectors)
+            ]
+        except Exception as e:
+            logger.error(f"Batch search failed: {e}")
+            return [[] for _ in searches]
+
+    async def aclose(self) -> None:
+        if self.aqdrant is not None:
+            await self.aqdrant.close()
+        self.query_batcher.close()
+        self._embed_executor.shutdown(wait=False)
+        self._upsert_executor.shutdown(wait=False)
+
 
 class LLMService:
     def __init__(self):
         # External LLM Service URL
-        self.api_url = os.getenv("LLM_API_URL", "http://llm_service:8000/v1")
-        logger.info(f"LLM Service URL: {self.api_url}")
+        # Several replicas: LLM_API_URLS=http://llm1:8000/v1,http://llm2:8000/v1
+        urls = [u.strip() for u in os.getenv("LLM_API_URLS", "").split(",") if u.strip()]
+        urls = urls or [os.getenv("LLM_API_URL", "http://llm_service:8000/v1")]
+        self.api_url = urls[0]
+        logger.info(f"LLM Service URLs: {urls}")
+        # Least-outstanding routing with a circuit breaker per replica
+        self.pool = BackendPool(
+            urls,
+            failure_threshold=int(os.getenv("LLM_CB_FAILURES", "3")),
+            cooldown=float(os.getenv("LLM_CB_COOLDOWN", "10")),
+        )
+
+        # Request options of the native llama.cpp `llama-server`: keep the KV
+        # cache of the previous prompt so the shared prefix (system prompt) is
+        # not processed again, optionally pinned to one slot (-1 lets the
+        # server pick). llama-cpp-python's server (Dockerfile.llm) ignores
+        # both; there the prefix cache comes from its --cache flag.
+        self.cache_prompt = os.getenv("LLM_CACHE_PROMPT", "true").lower() == "true"
+        self.slot_id = int(os.getenv("LLM_SLOT_ID", "-1"))
+
+        # Shared, pooled client for the async request path. Waiting on a slow
+        # generation holds a socket, not a thread.
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=20,
+            ),
+        )
 
-    def generate_response(self, context: str, question: str) -> Tuple[str, str]:
-        """Returns (answer, full_prompt)"""
+    SYSTEM_PROMPT = (
+        "Você é um assistente médico útil e preciso. "
+        "Use o contexto enviado junto com a pergunta para responder."
+    )
 
-        system_prompt = "Você é um assistente médico útil e preciso. Use o contexto abaixo para responder à pergunta."
+    @classmethod
+    def build_messages(cls, context: str, question: str) -> Tuple[List[Dict], str]:
+        """Returns (messages, full_prompt_debug)
 
+        The system message is the same for every request, so the server can
+        reuse its KV cache; everything that varies goes in the user message.
+        """
         # OpenaAI-compatible Prompt Construction
         messages = [
-            {"role": "system", "content": f"{system_prompt}\n\nContexto:\n{context}"},
-            {"role": "user", "content": question},
+            {"role": "system", "content": cls.SYSTEM_PROMPT},
+            {"role": "user", "content": f"Contexto:\n{context}\n\nPergunta: {question}"},
         ]
 
-        # Visualize prompt for education
-        full_prompt_debug = (
-            f"SYSTEM: {system_prompt}\nCONTEXT: {context}\nUSER: {question}"
+        # Visualize prompt for education: rendered from the messages actually sent
+        full_prompt_debug = "\n\n".join(
+            f"{message['role'].upper()}:\n{message['content']}" for message in messages
         )
+        return messages, full_prompt_debug
 
-        try:
-            resp = requests.post(
-                f"{self.api_url}/chat/completions",
-                json={"messages": messages, "max_tokens": 512, "temperature": 0.3},
-                timeout=120,
+    def _payload(self, messages: List[Dict], **extra) -> Dict:
+        payload = {"messages": messages, "max_tokens": 512, "temperature": 0.3}
+        if self.cache_prompt:
+            payload["cache_prompt"] = True
+            if self.slot_id >= 0:
+                payload["id_slot"] = self.slot_id
+        return {**payload, **extra}
+
+    async def acomplete(self, messages: List[Dict]) -> str:
+        """Raw async completion; raises on failure."""
+        with stage_timer("llm"), self.pool.route() as api_url:
+            resp = await self.http.post(
+                f"{api_url}/chat/completions", json=self._payload(messages)
             )
             resp.raise_for_status()
             data = resp.json()
-            answer = data["choices"][0]["message"]["content"]
-            return answer, full_prompt_debug
-        except Exception as e:
-            logger.error(f"LLM call failed: {e}")
-            return f"Erro ao contatar LLM: {str(e)}", full_prompt_debug
+        record_usage(data.get("usage"))
+        return data["choices"][0]["message"]["content"]
 
-    def check_health(self) -> bool:
+    async def astream_response(self, messages: List[Dict]) -> AsyncIterator[str]:
+        """Yields answer tokens as the server streams them (OpenAI SSE chunks)."""
+        with stage_timer("llm_stream"), self.pool.route() as api_url:
+            async with self.http.stream(
+                "POST",
+                f"{api_url}/chat/completions",
+                json=self._payload(
+                    messages,
+                    stream=True,
+                    # Final chunk carries the token usage (choices is empty there)
+                    stream_options={"include_usage": True},
+                ),
+            ) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    record_usage(chunk.get("usage"))
+                    if not chunk.get("choices"):
+                        continue
+                    delta = chunk["choices"][0].get("delta", {})
+                    if delta.get("content"):
+                        yield delta["content"]
+
+    async def _acheck_backend(self, url: str) -> bool:
         try:
-            # Lightweight check to LLM models endpoint
-            resp = requests.get(f"{self.api_url}/models", timeout=2.0)
+            resp = await self.http.get(f"{url}/models", timeout=2.0)
             return resp.status_code == 200
         except Exception:
             return False
 
+    async def acheck_health(self) -> bool:
+        results = await asyncio.gather(
+            *(self._acheck_backend(backend.url) for backend in self.pool.backends)
+        )
+        return any(results)
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+
+class RerankerService:
+    """Optional second stage: a small cross-encoder scores (question, chunk)
+    pairs on CPU and keeps the best k of an over-fetched candidate list.
+
+    Calls queue for a rerank worker and each has a hard time budget (queue
+    wait included); past it, or when more than RERANK_MAX_QUEUE calls are
+    already waiting, the candidates keep their vector order.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+        self.candidates = int(os.getenv("RERANK_CANDIDATES", "20"))
+        self.budget_ms = float(os.getenv("RERANK_BUDGET_MS", "300"))
+        self.workers = int(os.getenv("RERANK_WORKERS", "1"))
+        self.max_queue = int(os.getenv("RERANK_MAX_QUEUE", "8"))
+        self.model = None
+        if self.enabled:
+            model_name = os.getenv("RERANK_MODEL", "Xenova/ms-marco-MiniLM-L-6-v2")
+            logger.info(f"Loading reranker model {model_name}...")
+            self.model = TextCrossEncoder(model_name=model_name)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="rerank"
+        )
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    def _score(self, question: str, texts: List[str]) -> List[float]:
+        return [float(score) for score in self.model.rerank(question, texts)]
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._inflight -= 1
+
+    async def arerank(
+        self, question: str, docs: List[Dict], top_k: int
+    ) -> Tuple[List[Dict], Dict]:
+        """Returns (best top_k docs, info). info reports whether the rerank was
+        applied, how many candidates it saw and how long it took."""
+        info = {
+            "applied": False,
+            "candidates": len(docs),
+            "elapsed_ms": 0.0,
+            "timed_out": False,
+            "busy": False,
+        }
+        if len(docs) <= 1:
+            return docs[:top_k], info
+
+        with self._lock:
+            # Queued calls are cancelled when their budget runs out, but a
+            # timed-out call already scoring keeps its worker: bound the queue
+            if self._inflight >= self.workers + self.max_queue:
+                logger.warning("Reranker queue full, keeping vector order")
+                info["busy"] = True
+                return docs[:top_k], info
+            self._inflight += 1
+
+        start = time.perf_counter()
+        future = self._executor.submit(
+            self._score, question, [doc["text"] for doc in docs]
+        )
+        # Runs when the job finishes or when it is cancelled before starting
+        # (budget expired or request cancelled while queued), so the slot is
+        # always given back
+        future.add_done_callback(self._release)
+        try:
+            scores = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.budget_ms / 1000
+            )
+        except asyncio.TimeoutError:
+            info["timed_out"] = True
+            info["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            logger.warning(f"Rerank exceeded {self.budget_ms}ms, keeping vector order")
+            return docs[:top_k], info
+
+        info["applied"] = True
+        info["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        ranked = sorted(zip(scores, docs), key=lambda pair: pair[0], reverse=True)
+        return [
+            {**doc, "rerank_score": score} for score, doc in ranked[:top_k]
+        ], info
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
 class OrchestratorService:
     def __init__(self):
         self.vector_db = VectorDbService()
         self.llm_service = LLMService()
+        self.reranker = RerankerService()
         self.document_processor = DocumentProcessor()
+        # Trims retrieved chunks to the sentences most relevant to the question
+        self.compressor = ContextCompressor(self.vector_db.embedder)
+        # Identical questions asked while an answer is being generated share it
+        self.coalesce = os.getenv("ASK_COALESCE", "true").lower() == "true"
+        self.ask_flights = SingleFlight("ask")
+
+        # Reuses answers for paraphrased questions over the same documents
+        self.answer_cache = SemanticAnswerCache(
+            max_size=int(os.getenv("SEMANTIC_CACHE_SIZE", "256")),
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+        )
+
+    async def _aretrieve(
+        self,
+        question: str,
+        top_k: int,
+        filters: Optional[Dict[str, FilterValue]] = None,
+    ) -> Tuple[List[float], List[Dict], Dict]:
+        """Returns (question vector, docs, meta). The vector is kept for the
+        answer cache; meta carries the rerank report (None when disabled)."""
+        query_vector = (await self.vector_db.aembed_queries([question]))[0]
+
+        if not self.reranker.enabled:
+            docs = await self.vector_db.asearch_by_vector(
+                query_vector, top_k=top_k, filters=filters, query=question
+            )
+            return query_vector, docs, {"rerank": None}
+
+        # Over-fetch, then let the cross-encoder pick the best top_k
+        candidates = await self.vector_db.asearch_by_vector(
+            query_vector,
+            top_k=max(self.reranker.candidates, top_k),
+            filters=filters,
+            query=question,
+        )
+        with stage_timer("rerank"):
+            docs, rerank_info = await self.reranker.arerank(question, candidates, top_k)
+        return query_vector, docs, {"rerank": rerank_info}
+
+    async def _acompress(
+        self, question: str, query_vector: List[float], texts: List[str]
+    ) -> Tuple[str, Optional[Dict]]:
+        """Returns (context, compression report or None when disabled)."""
+        if not self.compressor.enabled:
+            return format_context(texts), None
+
+        def render(context: str) -> str:
+            # Prompt tokens are estimated on the prompt as build_messages renders it
+            return self.llm_service.build_messages(context, question)[1]
+
+        loop = asyncio.get_running_loop()
+        with stage_timer("compress"):
+            # Sentence embedding is CPU work: run it on the embedding pool
+            return await loop.run_in_executor(
+                self.vector_db._embed_executor,
+                self.compressor.compress,
+                query_vector,
+                texts,
+                render,
+            )
+
+    async def aask(
+        self,
+        question: str,
+        top_k: int = 3,
+        filters: Optional[Dict[str, FilterValue]] = None,
+    ) -> Tuple[str, List[Dict], List[str], str, Dict]:
+        """Same pipeline as ask(), without blocking a thread on I/O.
+
+        Returns (answer, docs, retrieved_texts, debug_prompt, meta), where meta
+        reports pipeline details: {"cache_hit": bool, "coalesced": bool,
+        "rerank": dict | None, "compression": dict | None}.
+
+        Concurrent calls with the same normalized question, top_k and filters
+        run the pipeline once; the others get its result with coalesced=True.
+        """
+        if self.coalesce:
+            key = (
+                normalize_query(question),
+                top_k,
+                json.dumps(filters, sort_keys=True),
+            )
+            result, coalesced = await self.ask_flights.do(
+                key, lambda: self._aask(question, top_k, filters)
+            )
+        else:
+            result, coalesced = await self._aask(question, top_k, filters), False
+
+        answer, docs, retrieved_texts, debug_prompt, meta = result
+        return (
+            answer,
+            docs,
+            retrieved_texts,
+            debug_prompt,
+            {**meta, "coalesced": coalesced},
+        )
+
+    async def _aask(
+        self, question: str, top_k: int, filters: Optional[Dict[str, FilterValue]]
+    ) -> Tuple[str, List[Dict], List[str], str, Dict]:
+        with stage_timer("ask"):
+            # 1. Retrieve
+            query_vector, docs, meta = await self._aretrieve(question, top_k, filters)
+            retrieved_texts = [d["text"] for d in docs]
+            doc_ids = [d["id"] for d in docs]
+            generation = self.vector_db.generation
+
+            cached = self.answer_cache.lookup(query_vector, doc_ids, generation)
+            if cached is not None:
+                answer, debug_prompt = cached
+                return (
+                    answer,
+                    docs,
+                    retrieved_texts,
+                    debug_prompt,
+                    {**meta, "cache_hit": True, "compression": None},
+                )
+
+            context_str, compression = await self._acompress(
+                question, query_vector, retrieved_texts
+            )
+            with stage_timer("prompt"):
+                messages, debug_prompt = self.llm_service.build_messages(
+                    context_str, question
+                )
+
+            # 2. Generate
+            try:
+                answer = await self.llm_service.acomplete(messages)
+            except Exception as e:
+                logger.error(f"LLM call failed: {e}")
+                answer = f"Erro ao contatar LLM: {str(e)}"
+            else:
+                self.answer_cache.store(
+                    query_vector, doc_ids, generation, (answer, debug_prompt)
+                )
 
-    def ask(self, question: str) -> Tuple[str, List[Dict], List[str], str]:
+            return (
+                answer,
+                docs,
+                retrieved_texts,
+                debug_prompt,
+                {**meta, "cache_hit": False, "compression": compression},
+            )
+
+    async def aask_stream(
+        self,
+        question: str,
+        top_k: int = 3,
+        filters: Optional[Dict[str, FilterValue]] = None,
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """Yields (event, data): one "docs" event, then "token" events as the
+        LLM generates, then "done" (or "error")."""
         # 1. Retrieve
-        docs = self.vector_db.search(question, top_k=3)
+        query_vector, docs, meta = await self._aretrieve(question, top_k, filters)
         retrieved_texts = [d["text"] for d in docs]
-        context_str = "\n".join([f"- {t}" for t in retrieved_texts])
+        doc_ids = [d["id"] for d in docs]
+        generation = self.vector_db.generation
 
-        # 2. Generate
-        answer, debug_prompt = self.llm_service.generate_response(context_str, question)
+        cached = self.answer_cache.lookup(query_vector, doc_ids, generation)
+        if cached is not None:
+            answer, debug_prompt = cached
+            yield "docs", {
+                "retrieved_docs": docs,
+                "built_prompt": debug_prompt,
+                **meta,
+                "cache_hit": True,
+                "compression": None,
+            }
+            yield "token", {"content": answer}
+            yield "done", {"answer": answer}
+            return
 
-        return answer, docs, retrieved_texts, debug_prompt
-    
-    def get_health(self) -> Dict[str, str]:
-        return {
-            "vector_db": "online" if self.vector_db.check_health() else "offline",
-            "llm": "online" if self.llm_service.check_health() else "offline"
+        context_str, compression = await self._acompress(
+            question, query_vector, retrieved_texts
+        )
+        with stage_timer("prompt"):
+            messages, debug_prompt = self.llm_service.build_messages(
+                context_str, question
+            )
+        yield "docs", {
+            "retrieved_docs": docs,
+            "built_prompt": debug_prompt,
+            **meta,
+            "cache_hit": False,
+            "compression": compression,
         }
-    
-    def process_and_ingest_file(self, content: bytes, filename: str) -> int:
+
+        # 2. Generate, relaying tokens as they arrive
+        answer = []
+        try:
+            async for token in self.llm_service.astream_response(messages):
+                answer.append(token)
+                yield "token", {"content": token}
+        except Exception as e:
+            logger.error(f"LLM stream failed: {e}")
+            yield "error", {"detail": f"Erro ao contatar LLM: {str(e)}"}
+            return
+
+        answer = "".join(answer)
+        self.answer_cache.store(query_vector, doc_ids, generation, (answer, debug_prompt))
+        yield "done", {"answer": answer}
+
+    async def aclose(self) -> None:
+        await self.vector_db.aclose()
+        await self.llm_service.aclose()
+        self.reranker.close()
+
+    @staticmethod
+    def file_type(filename: str) -> str:
+        """Returns the lower-cased extension; raises ValueError if unsupported."""
         ext = filename.split(".")[-1].lower()
-        text = ""
-
-        if ext == "pdf":
-            text = self.document_processor.process_pdf(content)
-        elif ext in ["docx", "doc"]:
-            text = self.document_processor.process_docx(content)
-        elif ext in ["png", "jpg", "jpeg", "tiff"]:
-            text = self.document_processor.process_image(content)
-        elif ext == "txt":
-            text = self.document_processor.process_txt(content)
-        else:
+        if ext not in ["pdf", "docx", "doc", "png", "jpg", "jpeg", "tiff", "txt"]:
             raise ValueError(f"Unsupported file type: {ext}")
+        return ext
+
+    def process_and_ingest_file(
+        self,
+        path: str,
+        filename: str,
+        progress: Optional[Callable[[str, int, int], None]] = None,
+    ) -> int:
+        """Extracts, chunks and ingests the file at path; filename gives the
+        type and the source. progress(stage, done, total) is called as work
+        advances, with done/total counted in chunks (total is 0 for text
+        files, which are streamed)."""
+        ext = self.file_type(filename)
 
-        if not text.strip():
-            logger.warning(f"No text extracted from {filename}")
-            return 0
+        if progress:
+            progress("extracting", 0, 0)
+
+        if ext == "txt":
+            # Paragraphs go to the embedder as they are read
+            chunks = (c for c in self.document_processor.process_txt(path) if c)
+        else:
+            text = ""
+            if ext == "pdf":
+                text = self.document_processor.process_pdf(path)
+            elif ext in ["docx", "doc"]:
+                text = self.document_processor.process_docx(path)
+            elif ext in ["png", "jpg", "jpeg", "tiff"]:
+                text = self.document_processor.process_image(path)
 
-        chunks = [c.strip() for c in text.split("\n\n") if c.strip()]
-        if not chunks:
-            chunks = [text]  # Fallback
+            if not text.strip():
+                logger.warning(f"No text extracted from {filename}")
+                return 0
 
-        return self.vector_db.ingest(chunks, source=filename)
+            chunks = [c.strip() for c in text.split("\n\n") if c.strip()]
+            if not chunks:
+                chunks = [text]  # Fallback
+
+        if not progress:
+            return self.vector_db.ingest(chunks, source=filename)
+
+        progress("embedding", 0, len(chunks) if isinstance(chunks, list) else 0)
+        return self.vector_db.ingest(
+            chunks,
+            source=filename,
+            progress=lambda done, total: progress("embedding", done, total),
+        )
 
 
 # --- Seeder Logic ---
@@ -448,14 +1559,34 @@ MEDICAL_DATA = [
 ]
 
 
+def seed_records() -> List[Tuple[str, str]]:
+    """(text, source) pairs stored on a fresh collection; the source is the
+    specialty, so searches can be filtered by it."""
+    return list(MEDICAL_DATA)
+
+
 def seed_database(service: VectorDbService):
     try:
         service.ensure_collection()
         count = service.qdrant.count(collection_name=service.collection_name).count
         if count == 0:
             logger.info("Database empty. Seeding medical data...")
-            texts = [item[0] for item in MEDICAL_DATA]
-            service.ingest(texts, source="System Init")
-            logger.info("Seeding complete!")
+            records = seed_records()
+            # Vectors precomputed at build time skip the embedder entirely
+            vectors = load_seed_artifact(
+                os.getenv("SEED_ARTIFACT", SEED_ARTIFACT_PATH),
+                seed_fingerprint(EMBED_MODEL, service.vector_size, records),
+            )
+            by_source: Dict[str, List[int]] = {}
+            for i, (_, source) in enumerate(records):
+                by_source.setdefault(source, []).append(i)
+            for source, rows in by_source.items():
+                texts = [records[i][0] for i in rows]
+                if vectors is not None:
+                    service.ingest_vectors(texts, vectors[rows], source=source)
+                else:
+                    service.ingest(texts, source=source)
+            mode = "precomputed vectors" if vectors is not None else "live embedding"
+            logger.info(f"Seeding complete ({mode})!")
     except Exception as e:
         logger.warning(f"Seeding failed: {e}")
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+
+from batching import MicroBatcher
+
+
+def make_batcher(release: threading.Event, calls: list) -> MicroBatcher:
+    def double(items):
+        release.wait(timeout=5)
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    return MicroBatcher(double, max_batch=8, window_ms=1, name="test")
+
+
+def test_cancelled_waiter_does_not_kill_the_worker():
+    release, calls = threading.Event(), []
+    batcher = make_batcher(release, calls)
+    try:
+        busy = batcher.submit(1)  # holds the worker inside fn
+        cancelled = batcher.submit(2)
+        assert cancelled.cancel()
+        release.set()
+
+        assert busy.result(timeout=5) == 2
+        assert batcher.submit(3).result(timeout=5) == 6
+        assert [2] not in calls
+    finally:
+        batcher.close()
+
+
+def test_cancelled_asyncio_waiter_then_submit_again():
+    release, calls = threading.Event(), []
+    batcher = make_batcher(release, calls)
+
+    async def scenario():
+        busy = asyncio.wrap_future(batcher.submit(1))
+        waiter = asyncio.ensure_future(asyncio.wrap_future(batcher.submit(2)))
+        await asyncio.sleep(0.01)
+        waiter.cancel()  # what a client closing its connection does
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await busy == 2
+        return await asyncio.wait_for(asyncio.wrap_future(batcher.submit(3)), 5)
+
+    try:
+        assert asyncio.run(scenario()) == 6
+    finally:
+        batcher.close()
+
+
+def test_failed_batch_keeps_serving():
+    def flaky(items):
+        if 0 in items:
+            raise ValueError("bad item")
+        return items
+
+    batcher = MicroBatcher(flaky, window_ms=1, name="test")
+    try:
+        assert isinstance(batcher.submit(0).exception(timeout=5), ValueError)
+        assert batcher.submit(5).result(timeout=5) == 5
+    finally:
+        batcher.close()
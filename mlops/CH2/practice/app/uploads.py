@@ -0,0 +1,116 @@
+import os
+import tempfile
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload is bigger than the configured limit."""
+
+
+class InvalidUploadError(ValueError):
+    """Raised when the request is not a multipart form with the file field."""
+
+
+async def spool_upload(
+    request: Request,
+    max_bytes: int,
+    field: str = "file",
+    check_filename: Optional[Callable[[str], object]] = None,
+    directory: Optional[str] = None,
+) -> Tuple[str, str]:
+    """Streams a multipart/form-data body straight into a temporary file and
+    returns (path, filename) of its `field` part; the caller owns the file.
+
+    The body is parsed as it arrives, so only one network chunk is in
+    memory, the upload is written to disk once, and a body past max_bytes
+    stops being read as soon as the limit is crossed (UploadTooLargeError),
+    with or without a Content-Length. check_filename(filename) runs as soon
+    as the part's headers arrive; whatever it raises is propagated before
+    the content is read. The partial file is removed on any error.
+    """
+    content_type, options = parse_options_header(
+        request.headers.get("content-type", "")
+    )
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise InvalidUploadError("Expected a multipart/form-data upload")
+
+    # Parser callbacks are synchronous: they only record what they saw, and
+    # the loop below does the (threaded) disk writes
+    state = {"header": b"", "headers": {}, "in_file": False, "filename": None}
+    pending: List[bytes] = []
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        state["header"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        key = state["header"].lower()
+        state["headers"][key] = state["headers"].get(key, b"") + data[start:end]
+
+    def on_header_end() -> None:
+        state["header"] = b""
+
+    def on_headers_finished() -> None:
+        _, disposition = parse_options_header(
+            state["headers"].get(b"content-disposition", b"")
+        )
+        state["headers"] = {}
+        state["in_file"] = (
+            disposition.get(b"name") == field.encode()
+            and b"filename" in disposition
+            and state["filename"] is None
+        )
+        if state["in_file"]:
+            state["filename"] = disposition[b"filename"].decode("utf-8", "replace")
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if state["in_file"]:
+            pending.append(data[start:end])
+
+    def on_part_end() -> None:
+        state["in_file"] = False
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=directory)
+    try:
+        received = 0
+        checked = False
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in request.stream():
+                # Counts the raw body (form framing included), so the limit
+                # holds even for chunked requests without Content-Length
+                received += len(chunk)
+                if received > max_bytes:
+                    raise UploadTooLargeError(
+                        f"File exceeds the upload limit of {max_bytes // (1024 * 1024)} MB"
+                    )
+                parser.write(chunk)
+                if state["filename"] is not None and not checked:
+                    checked = True
+                    if check_filename:
+                        check_filename(state["filename"])
+                if pending:
+                    await run_in_threadpool(out.writelines, pending)
+                    pending.clear()
+            parser.finalize()
+        if state["filename"] is None:
+            raise InvalidUploadError(f"Missing file field '{field}'")
+        return path, state["filename"]
+    except BaseException:
+        os.remove(path)
+        raise
@@ -0,0 +1,91 @@
+"""Query embedding benchmark: one model call per request vs micro-batching.
+
+Fires --concurrency callers at a MicroBatcher wrapping the FastEmbed model,
+each embedding distinct single queries (no cache), and reports queries/sec
+and per-query latency. "unbatched" is the same batcher with max_batch=1,
+which is what one embed([query]) call per request amounts to.
+
+    python benchmarks/bench_embed_batching.py --queries 2000 --concurrency 32
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+
+def run(batcher, queries, concurrency):
+    latencies = []
+    lock = threading.Lock()
+
+    def call(query):
+        start = time.perf_counter()
+        batcher.submit(query).result()
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, queries))
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    from batching import MicroBatcher
+    from fastembed import TextEmbedding
+    from services import EMBED_MODEL, MEDICAL_DATA
+
+    embedder = TextEmbedding(model_name=EMBED_MODEL)
+    embed = lambda texts: [emb.tolist() for emb in embedder.embed(texts)]  # noqa: E731
+    embed(["warm up"])
+
+    queries = [
+        f"O que é {MEDICAL_DATA[i % len(MEDICAL_DATA)][0].split(':')[0]}? ({i})"
+        for i in range(args.queries)
+    ]
+    modes = {
+        "unbatched": {"max_batch": 1, "window_ms": 0.0},
+        "micro_batched": {"max_batch": args.max_batch, "window_ms": args.window_ms},
+    }
+
+    results = []
+    for mode, config in modes.items():
+        batcher = MicroBatcher(embed, name=mode, **config)
+        elapsed, latencies = run(batcher, queries, args.concurrency)
+        batcher.close()
+        results.append(
+            {
+                "mode": mode,
+                **config,
+                "queries_per_sec": round(len(queries) / elapsed, 1),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+            }
+        )
+
+    print(
+        json.dumps(
+            {"queries": len(queries), "concurrency": args.concurrency, "results": results},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
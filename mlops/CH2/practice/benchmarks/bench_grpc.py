@@ -0,0 +1,121 @@
+"""Qdrant transport benchmark: REST + lists vs gRPC + numpy arrays.
+
+Ingests --docs points (random float32 vectors, so the embedding model does
+not dominate) through VectorDbService.ingest_vectors, then runs --queries
+searches in calls of --batch queries, once per transport:
+
+- rest: the default client; each batch matrix becomes Python lists and
+  the points are sent as JSON;
+- grpc: QDRANT_PREFER_GRPC=true; points are built as protobuf straight
+  from the float32 matrix.
+
+Needs a running Qdrant with both ports open (docker compose up qdrant):
+
+    python benchmarks/bench_grpc.py --docs 20000 --queries 2000
+
+Reports wall time and client CPU time (serialization happens in the API
+process) per phase. Each transport uses its own collection, deleted at
+the end.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+
+def timed(fn):
+    wall, cpu = time.perf_counter(), time.process_time()
+    fn()
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def normalized(rng, n: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run(transport: str, args) -> dict:
+    os.environ["QDRANT_PREFER_GRPC"] = "true" if transport == "grpc" else "false"
+    os.environ["QDRANT_COLLECTION"] = f"bench_transport_{transport}"
+    from services import MEDICAL_DATA, VectorDbService
+
+    service = VectorDbService()
+    if service.qdrant.collection_exists(service.collection_name):
+        service.qdrant.delete_collection(service.collection_name)
+
+    rng = np.random.default_rng(args.seed)
+    texts = [
+        f"{MEDICAL_DATA[i % len(MEDICAL_DATA)][0]} (registro {i})"
+        for i in range(args.docs)
+    ]
+    dense = normalized(rng, args.docs, service.vector_size)
+    queries = normalized(rng, args.queries, service.vector_size).tolist()
+
+    ingest_wall, ingest_cpu = timed(
+        lambda: service.ingest_vectors(texts, dense, source="bench")
+    )
+
+    def search():
+        for start in range(0, len(queries), args.batch):
+            service.qdrant.query_batch_points(
+                collection_name=service.collection_name,
+                requests=[
+                    service._query_request(vector, None, args.top_k)
+                    for vector in queries[start:start + args.batch]
+                ],
+            )
+
+    search_wall, search_cpu = timed(search)
+    service.qdrant.delete_collection(service.collection_name)
+
+    return {
+        "ingest_seconds": round(ingest_wall, 3),
+        "ingest_cpu_seconds": round(ingest_cpu, 3),
+        "docs_per_sec": round(args.docs / ingest_wall, 1),
+        "search_seconds": round(search_wall, 3),
+        "search_cpu_seconds": round(search_cpu, 3),
+        "queries_per_sec": round(args.queries / search_wall, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=16, help="Queries per call")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--hybrid", action="store_true", help="Also store BM25 sparse vectors"
+    )
+    args = parser.parse_args()
+
+    os.environ["QDRANT_HOST"] = args.host
+    os.environ["HYBRID_SEARCH"] = "true" if args.hybrid else "false"
+    os.environ.pop("QDRANT_PATH", None)
+    sys.path.insert(0, APP_DIR)
+
+    results = {transport: run(transport, args) for transport in ("rest", "grpc")}
+    print(
+        json.dumps(
+            {
+                "docs": args.docs,
+                "queries": args.queries,
+                "batch": args.batch,
+                "hybrid": args.hybrid,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
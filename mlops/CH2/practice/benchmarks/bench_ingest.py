@@ -0,0 +1,119 @@
+"""Bulk ingest benchmark: pipelined VectorDbService.ingest vs the old path.
+
+The old path embeds every text into one list and sends a single upsert.
+The pipelined path embeds in INGEST_BATCH_SIZE batches and overlaps each
+embedding with the upsert of the previous batch.
+
+Each mode runs in its own process so peak RSS is measured separately.
+Qdrant runs in local mode, so no server is needed. Hybrid search is
+turned off so both modes store the same dense-only points:
+
+    python benchmarks/bench_ingest.py --docs 20000 --batch-size 64
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import uuid
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+
+def make_texts(n: int):
+    # Seed sentences with a counter, so every chunk is unique (no id dedupe)
+    from services import MEDICAL_DATA
+
+    for i in range(n):
+        yield f"{MEDICAL_DATA[i % len(MEDICAL_DATA)][0]} (registro {i})"
+
+
+def run_legacy(service, n: int) -> int:
+    from qdrant_client.http import models as qmodels
+
+    service.ensure_collection()
+    texts = list(make_texts(n))
+    embeddings = list(service.embedder.embed(texts))
+    points = [
+        qmodels.PointStruct(
+            id=str(uuid.uuid4()),
+            vector=emb.tolist(),
+            payload={"text": text, "source": "bench"},
+        )
+        for text, emb in zip(texts, embeddings)
+    ]
+    service.qdrant.upsert(collection_name=service.collection_name, points=points)
+    return len(points)
+
+
+def run_pipelined(service, n: int) -> int:
+    return service.ingest(make_texts(n), source="bench")
+
+
+def child(mode: str, n: int) -> None:
+    sys.path.insert(0, APP_DIR)
+    from services import VectorDbService
+
+    service = VectorDbService()
+    # Warm up the model outside of the measurement
+    list(service.embedder.embed(["warm up"]))
+
+    start = time.perf_counter()
+    inserted = (run_legacy if mode == "legacy" else run_pipelined)(service, n)
+    elapsed = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "mode": mode,
+                "docs": inserted,
+                "seconds": round(elapsed, 3),
+                "docs_per_sec": round(inserted / elapsed, 1),
+                # Linux reports ru_maxrss in KiB
+                "peak_rss_mb": round(
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+                ),
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--modes", default="legacy,pipelined")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.docs)
+        return
+
+    env = {
+        **os.environ,
+        "QDRANT_PATH": os.getenv("QDRANT_PATH", ":memory:"),
+        "INGEST_BATCH_SIZE": str(args.batch_size),
+        # Dense only: the legacy path stores one unnamed vector per point, so
+        # both modes must use that layout and do the same (no BM25) work
+        "HYBRID_SEARCH": "false",
+    }
+    results = []
+    for mode in args.modes.split(","):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--docs", str(args.docs)],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(json.dumps({"batch_size": args.batch_size, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
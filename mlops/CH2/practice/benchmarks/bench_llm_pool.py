@@ -0,0 +1,98 @@
+"""LLM replica pool benchmark: least-outstanding routing and circuit breaking.
+
+Starts mock llama.cpp servers (benchmarks/mock_llm.py): a fast replica, a
+slow one and one that always fails. Sends --requests completions with
+--concurrency in flight through LLMService, first with the fast replica
+alone, then with all three in LLM_API_URLS, and prints throughput,
+latency and the per-replica report of the pool.
+
+    python benchmarks/bench_llm_pool.py --requests 200 --concurrency 16
+
+The failing replica should be ejected after LLM_CB_FAILURES errors and get
+only a half-open trial call every LLM_CB_COOLDOWN seconds afterwards.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import ExitStack
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+REPLICAS = {
+    "fast": {"MOCK_GEN_TPS": "100"},
+    "slow": {"MOCK_GEN_TPS": "25"},
+    "failing": {"MOCK_FAIL_RATE": "1"},
+}
+
+
+async def run(llm, n: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    messages = [{"role": "user", "content": "O que é dengue?"}]
+
+    async def call():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await llm.acomplete(messages)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests_per_sec": round(n / elapsed, 1),
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1) if latencies else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1) if latencies else None,
+        "backends": llm.pool.stats(),
+    }
+
+
+async def bench(urls, args):
+    from services import LLMService
+
+    results = {}
+    for mode, backends in (("single", urls[:1]), ("pool", urls)):
+        os.environ["LLM_API_URLS"] = ",".join(backends)
+        llm = LLMService()
+        results[mode] = await run(llm, args.requests, args.concurrency)
+        await llm.aclose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--slots", default="4", help="MOCK_SLOTS per replica")
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    from mock_llm import mock_server
+
+    with ExitStack() as stack:
+        urls = [
+            stack.enter_context(mock_server(MOCK_SLOTS=args.slots, **env))
+            for env in REPLICAS.values()
+        ]
+        results = asyncio.run(bench(urls, args))
+
+    print(
+        json.dumps(
+            {"replicas": dict(zip(REPLICAS, urls)), "results": results}, indent=2
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
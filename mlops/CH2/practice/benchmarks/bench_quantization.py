@@ -0,0 +1,209 @@
+"""Quantization benchmark: memory, search latency and recall@k vs float32.
+
+Builds one collection per storage config (float, scalar int8, binary, with
+and without on-disk originals), runs the same queries against each and
+compares the results with an exact float32 search. Collections are created
+and searched through VectorDbService, configured per run with
+QDRANT_QUANTIZATION / QDRANT_ON_DISK / QDRANT_RESCORE / QDRANT_OVERSAMPLING,
+so what is measured is the service's own collection and search settings.
+
+By default it uses Qdrant local mode, so it runs offline:
+
+    python benchmarks/bench_quantization.py --points 20000 --queries 200
+
+Local mode is a brute-force NumPy store: it accepts the quantization
+settings but always searches the float vectors, so there recall is 1.0 and
+latency does not change (the JSON report carries a warning). Point it at a
+real server to measure the effect:
+
+    python benchmarks/bench_quantization.py --url http://localhost:6333
+
+Memory is the estimated vector RAM for each config (Qdrant does not report
+it per collection): float32 = 4 bytes/dim, int8 = 1 byte/dim, binary =
+1 bit/dim, with originals counted only when they are not on disk.
+
+Vectors are synthetic clustered unit vectors of the embedder's size (384),
+or real FastEmbed embeddings of the seed data with --real.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+from qdrant_client.http import models as qmodels
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+DIM = 384
+
+CONFIGS = {
+    "float32": {"quantization": "none", "on_disk": False, "rescore": False},
+    "scalar": {"quantization": "scalar", "on_disk": False, "rescore": True},
+    "scalar_on_disk": {"quantization": "scalar", "on_disk": True, "rescore": True},
+    "binary": {"quantization": "binary", "on_disk": False, "rescore": False},
+    "binary_rescore": {"quantization": "binary", "on_disk": True, "rescore": True},
+}
+
+
+def synthetic_vectors(n: int, n_queries: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 200, 8), DIM))
+    points = centers[rng.integers(len(centers), size=n)] + rng.normal(
+        scale=0.6, size=(n, DIM)
+    )
+    queries = points[rng.integers(n, size=n_queries)] + rng.normal(
+        scale=0.3, size=(n_queries, DIM)
+    )
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return points.astype(np.float32), queries.astype(np.float32)
+
+
+def real_vectors(n: int, n_queries: int):
+    from fastembed import TextEmbedding
+    from services import MEDICAL_DATA
+
+    embedder = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+    texts = [
+        f"{MEDICAL_DATA[i % len(MEDICAL_DATA)][0]} (registro {i})" for i in range(n)
+    ]
+    questions = [
+        f"O que é {text.split(':')[0]}?" for text, _ in MEDICAL_DATA
+    ] * (n_queries // len(MEDICAL_DATA) + 1)
+    points = np.stack(list(embedder.embed(texts)))
+    queries = np.stack(list(embedder.embed(questions[:n_queries])))
+    return points.astype(np.float32), queries.astype(np.float32)
+
+
+def estimated_ram_mb(n: int, config: dict) -> float:
+    quantized = {"scalar": DIM, "binary": DIM / 8}.get(config["quantization"], 0)
+    originals = 0 if config["on_disk"] else DIM * 4
+    return round(n * (quantized + originals) / 2**20, 2)
+
+
+def build_service(name: str, config: dict, args, points: np.ndarray):
+    """A dense-only VectorDbService whose collection `name` is created by
+    the service with the given storage config and filled with points."""
+    from services import VectorDbService
+
+    env = {
+        "QDRANT_COLLECTION": name,
+        "QDRANT_QUANTIZATION": config["quantization"],
+        "QDRANT_ON_DISK": str(config["on_disk"]).lower(),
+        "QDRANT_RESCORE": str(config["rescore"]).lower(),
+        "QDRANT_OVERSAMPLING": str(args.oversampling),
+        "QDRANT_PREFER_GRPC": "false",
+        "HYBRID_SEARCH": "false",
+    }
+    if args.url:
+        url = urlparse(args.url)
+        env.update(QDRANT_HOST=url.hostname, QDRANT_PORT=str(url.port or 6333))
+        os.environ.pop("QDRANT_PATH", None)
+    else:
+        env["QDRANT_PATH"] = ":memory:"
+    os.environ.update(env)
+
+    service = VectorDbService()
+    if service.qdrant.collection_exists(name):
+        service.qdrant.delete_collection(name)
+    service.ensure_collection()
+    service.qdrant.upload_collection(name, vectors=points, ids=range(len(points)))
+    wait_indexed(service, name)
+    return service
+
+
+def wait_indexed(service, name: str, timeout: float = 600) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if service.qdrant.get_collection(name).status == qmodels.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+
+
+def run_queries(service, queries, k, exact: bool = False):
+    """Searches with the service's own query request (and so its quantization
+    search params); exact=True swaps them for an exact float32 search."""
+    latencies, results = [], []
+    for query in queries.tolist():
+        request = service._query_request(query, None, k)
+        if exact:
+            request.params = qmodels.SearchParams(exact=True)
+        start = time.perf_counter()
+        response = service.qdrant.query_batch_points(
+            collection_name=service.collection_name, requests=[request]
+        )[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([point.id for point in response.points])
+    return latencies, results
+
+
+def close(service) -> None:
+    service.qdrant.delete_collection(service.collection_name)
+    asyncio.run(service.aclose())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Qdrant server URL (default: local mode)")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    parser.add_argument("--real", action="store_true", help="Use FastEmbed vectors")
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    points, queries = (real_vectors if args.real else synthetic_vectors)(
+        args.points, args.queries
+    )
+
+    # Ground truth: exact float32 search
+    truth = build_service("bench_truth", CONFIGS["float32"], args, points)
+    _, expected = run_queries(truth, queries, args.k, exact=True)
+    close(truth)
+
+    report = []
+    for label in args.configs.split(","):
+        config = CONFIGS[label]
+        service = build_service(f"bench_{label}", config, args, points)
+        run_queries(service, queries[:10], args.k)  # warm up
+        latencies, results = run_queries(service, queries, args.k)
+        close(service)
+
+        recall = np.mean(
+            [len(set(got) & set(want)) / args.k for got, want in zip(results, expected)]
+        )
+        report.append(
+            {
+                "config": label,
+                **config,
+                "estimated_ram_mb": estimated_ram_mb(len(points), config),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+                f"recall@{args.k}": round(float(recall), 4),
+            }
+        )
+
+    output = {
+        "qdrant": args.url or "local (:memory:)",
+        "points": len(points),
+        "queries": len(queries),
+        "oversampling": args.oversampling,
+        "results": report,
+    }
+    if not args.url:
+        output["warning"] = (
+            "Local mode ignores quantization and always searches float32 "
+            "vectors: recall is 1.0 and latency is flat by construction. "
+            "Pass --url with a Qdrant server for meaningful numbers."
+        )
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
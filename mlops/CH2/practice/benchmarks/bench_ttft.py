@@ -0,0 +1,131 @@
+"""Time-to-first-token benchmark: prompt layouts and prefix reuse.
+
+Streams the same sequence of RAG prompts (seed chunks as context) to an
+OpenAI-compatible server and measures the time until the first token:
+
+- context_in_system: the old layout, retrieved context inside the system
+  message, without cache_prompt;
+- context_in_system_cached: the same layout with cache_prompt;
+- static_system_cached: LLMService.build_messages (fixed system message,
+  context and question in the user message) with cache_prompt.
+
+Without --url it starts benchmarks/mock_llm.py on a free port:
+
+    python benchmarks/bench_ttft.py --requests 50
+    python benchmarks/bench_ttft.py --url http://localhost:8000/v1
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from contextlib import nullcontext
+
+import httpx
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..", "app")
+
+
+def legacy_messages(system_prompt, context, question):
+    return [
+        {"role": "system", "content": f"{system_prompt}\n\nContexto:\n{context}"},
+        {"role": "user", "content": question},
+    ]
+
+
+def ttft(client, url, messages, cache_prompt):
+    body = {
+        "messages": messages,
+        "max_tokens": 16,
+        "temperature": 0.3,
+        "stream": True,
+        "cache_prompt": cache_prompt,
+    }
+    start = time.perf_counter()
+    first = None
+    timings = {}
+    with client.stream("POST", f"{url}/chat/completions", json=body) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            timings = chunk.get("timings") or timings
+            choices = chunk.get("choices") or [{}]
+            if first is None and choices[0].get("delta", {}).get("content"):
+                first = (time.perf_counter() - start) * 1000
+    return first, timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="LLM base URL (default: start the mock)")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--context-docs", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    from mock_llm import mock_server
+    from services import MEDICAL_DATA, LLMService
+
+    rng = random.Random(42)
+    prompts = []
+    for _ in range(args.requests):
+        docs = rng.sample([text for text, _ in MEDICAL_DATA], args.context_docs)
+        topic = docs[0].split(":")[0]
+        prompts.append(("\n".join(f"- {d}" for d in docs), f"O que é {topic}?"))
+
+    layouts = {
+        "context_in_system": (
+            lambda c, q: legacy_messages(LLMService.SYSTEM_PROMPT, c, q), False
+        ),
+        "context_in_system_cached": (
+            lambda c, q: legacy_messages(LLMService.SYSTEM_PROMPT, c, q), True
+        ),
+        "static_system_cached": (
+            lambda c, q: LLMService.build_messages(c, q)[0], True
+        ),
+    }
+
+    with nullcontext(args.url) if args.url else mock_server() as url:
+        client = httpx.Client(timeout=120)
+        results = []
+        for name, (build, cache_prompt) in layouts.items():
+            latencies, cached = [], []
+            for context, question in prompts:
+                messages = build(context, question)
+                first, timings = ttft(client, url, messages, cache_prompt)
+                latencies.append(first)
+                if "cache_n" in timings:
+                    cached.append(timings["cache_n"])
+            results.append(
+                {
+                    "layout": name,
+                    "cache_prompt": cache_prompt,
+                    "ttft_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+                    "ttft_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+                    # Reported by llama.cpp's native server and the mock
+                    "avg_cached_tokens": (
+                        round(float(np.mean(cached)), 1) if cached else None
+                    ),
+                }
+            )
+        client.close()
+
+    print(
+        json.dumps(
+            {"url": args.url or "mock", "requests": len(prompts), "results": results},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Upload memory benchmark: peak RSS of the API while ingesting a big file.
+
+Generates a --size-mb text file (seed paragraphs repeated, so after the
+content-addressed dedupe only a few chunks are embedded and the run
+measures the upload and parsing path, not the model), starts the API
+with the mock LLM and Qdrant in local mode, uploads the file to
+/ingest-file and follows the job until it finishes. The API's RSS is
+sampled meanwhile (Linux /proc):
+
+    python benchmarks/bench_upload.py --size-mb 40
+
+Run it on an older commit to compare: with the whole upload read into
+memory, peak RSS grows with the file; spooled to disk, it should not.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..", "app")
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = rss_mb(pid)
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, rss_mb(self.pid))
+            time.sleep(self.interval)
+
+    def stop(self) -> float:
+        self._stop_event.set()
+        self.join()
+        return self.peak
+
+
+def write_text_file(path: str, size_mb: float) -> int:
+    from services import MEDICAL_DATA
+
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            for text, _ in MEDICAL_DATA:
+                written += f.write(f"{text}\n\n")
+    return os.path.getsize(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=40)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--job-timeout", type=float, default=1800)
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    from load_test import app_server, git_commit
+    from mock_llm import mock_server
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "upload.txt")
+        size = write_text_file(path, args.size_mb)
+
+        with mock_server() as llm_url:
+            app_env = {
+                "QDRANT_PATH": ":memory:",
+                "LLM_API_URL": llm_url,
+                "LLM_API_URLS": "",
+                "MAX_UPLOAD_MB": str(args.size_mb + 1),
+            }
+            with app_server(app_env, args.startup_timeout) as (url, pid):
+                baseline = rss_mb(pid)
+                sampler = RssSampler(pid)
+                sampler.start()
+
+                start = time.perf_counter()
+                with open(path, "rb") as f:
+                    resp = httpx.post(
+                        f"{url}/ingest-file",
+                        files={"file": ("upload.txt", f, "text/plain")},
+                        timeout=600,
+                    )
+                resp.raise_for_status()
+                upload_seconds = time.perf_counter() - start
+
+                job = resp.json()
+                deadline = time.time() + args.job_timeout
+                while job["status"] in ("queued", "running"):
+                    if time.time() > deadline:
+                        raise RuntimeError("Ingest job did not finish in time")
+                    time.sleep(0.5)
+                    job = httpx.get(f"{url}/jobs/{job['job_id']}").json()
+                total_seconds = time.perf_counter() - start
+                peak = sampler.stop()
+
+    print(
+        json.dumps(
+            {
+                "commit": git_commit(),
+                "file_mb": round(size / (1024 * 1024), 1),
+                "job_status": job["status"],
+                "chunks": job["processed_chunks"],
+                "upload_seconds": round(upload_seconds, 2),
+                "total_seconds": round(total_seconds, 2),
+                "baseline_rss_mb": round(baseline, 1),
+                "peak_rss_mb": round(peak, 1),
+                "peak_growth_mb": round(peak - baseline, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Offline load test of the API: /ask, /search and /ingest.
+
+Starts the mock LLM (benchmarks/mock_llm.py) and the FastAPI app (uvicorn)
+with Qdrant in local mode, so neither Docker nor a GPU is needed. Each
+scenario sends --requests calls with --concurrency in flight and reports
+latency percentiles, requests/sec and error rate as JSON:
+
+    python benchmarks/load_test.py --concurrency 16 --requests 200
+    python benchmarks/load_test.py --scenarios ask --unique --output before.json
+
+--unique makes every question distinct, so the embedding and answer caches
+do not hide the cost of the pipeline. App settings can be passed through
+the environment (e.g. RERANK_ENABLED=true python benchmarks/load_test.py);
+the mock LLM is configured with --llm-* options.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import httpx
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..", "app")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def app_server(env: dict, startup_timeout: float):
+    """Runs the API in a subprocess; yields (base URL, process id)."""
+    port = free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--app-dir", APP_DIR, "--port", str(port), "--log-level", "warning",
+        ],
+        env={**os.environ, **env},
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        # /health answers once startup (model load + seeding) is done
+        deadline = time.time() + startup_timeout
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("API exited during startup")
+            try:
+                if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.time() > deadline:
+                raise RuntimeError("API did not become healthy in time")
+            time.sleep(0.5)
+        yield url, proc.pid
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def make_requests(scenario: str, n: int, unique: bool, seed: int):
+    """(path, json body) pairs for one scenario."""
+    from services import MEDICAL_DATA
+
+    rng = random.Random(seed)
+    topics = [text.split(":")[0] for text, _ in MEDICAL_DATA]
+    calls = []
+    for i in range(n):
+        topic = rng.choice(topics)
+        suffix = f" (#{i})" if unique else ""
+        if scenario == "ask":
+            question = f"O que é {topic}?{suffix}"
+            calls.append(("/ask", {"question": question, "top_k": 3}))
+        elif scenario == "search":
+            calls.append(("/search", {"query": f"{topic}{suffix}", "top_k": 5}))
+        elif scenario == "ingest":
+            # Always unique: a repeated chunk would be skipped, not embedded
+            text = f"{rng.choice(MEDICAL_DATA)[0]} (carga {seed}-{i})"
+            calls.append(("/ingest", {"texts": [text], "source": "load-test"}))
+    return calls
+
+
+async def drive(url: str, calls, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def call(client, path, body):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                resp = await client.post(path, json=body)
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += 0 if ok else 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=300, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(call(client, path, body) for path, body in calls))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(calls),
+        "errors": errors,
+        "error_rate": round(errors / len(calls), 4),
+        "rps": round(len(calls) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default="search,ask,ingest")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--warmup", type=int, default=10, help="Untimed calls per scenario"
+    )
+    parser.add_argument("--unique", action="store_true", help="Bypass query caches")
+    parser.add_argument(
+        "--qdrant-path",
+        default=":memory:",
+        help='":memory:", a directory (on disk) or "tmp" for a temporary one',
+    )
+    parser.add_argument("--llm-prompt-tps", default="400")
+    parser.add_argument("--llm-gen-tps", default="25")
+    parser.add_argument("--llm-answer-tokens", default="32")
+    parser.add_argument("--llm-slots", default="4")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    from mock_llm import mock_server
+
+    qdrant_path = args.qdrant_path
+    tmp = None
+    if qdrant_path == "tmp":
+        tmp = tempfile.TemporaryDirectory()
+        qdrant_path = tmp.name
+
+    llm_env = {
+        "MOCK_PROMPT_TPS": args.llm_prompt_tps,
+        "MOCK_GEN_TPS": args.llm_gen_tps,
+        "MOCK_ANSWER_TOKENS": args.llm_answer_tokens,
+        "MOCK_SLOTS": args.llm_slots,
+    }
+    results = {}
+    with mock_server(**llm_env) as llm_url:
+        app_env = {
+            "QDRANT_PATH": qdrant_path,
+            "LLM_API_URL": llm_url,
+            "LLM_API_URLS": "",
+        }
+        with app_server(app_env, args.startup_timeout) as (url, _):
+            for seed, scenario in enumerate(args.scenarios.split(",")):
+                warmup = make_requests(scenario, args.warmup, True, seed + 1000)
+                asyncio.run(drive(url, warmup, args.concurrency))
+                calls = make_requests(scenario, args.requests, args.unique, seed)
+                results[scenario] = asyncio.run(drive(url, calls, args.concurrency))
+
+    if tmp:
+        tmp.cleanup()
+
+    report = {
+        "commit": git_commit(),
+        "concurrency": args.concurrency,
+        "unique": args.unique,
+        "qdrant_path": args.qdrant_path,
+        "llm": llm_env,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
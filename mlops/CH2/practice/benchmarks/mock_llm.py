@@ -0,0 +1,189 @@
+"""Mock OpenAI-compatible LLM server with a llama.cpp-like latency model.
+
+Simulates what matters for the API's latency on a CPU llama.cpp server:
+
+- prompt processing at MOCK_PROMPT_TPS tokens/sec, generation at
+  MOCK_GEN_TPS tokens/sec;
+- MOCK_SLOTS slots, each serving one request at a time;
+- per-slot prefix cache: with "cache_prompt": true, the tokens shared with
+  the slot's previous prompt are not processed again ("id_slot" pins a
+  slot, otherwise the idle slot with the longest common prefix is used).
+
+MOCK_FAIL_RATE makes that fraction of completions fail with a 500, to
+exercise the API's circuit breaker.
+
+Tokens are words/punctuation of the prompt rendered with a ChatML template,
+so counts are approximate but consistent between layouts. Responses carry
+"usage" and llama.cpp-style "timings" (prompt_n, cache_n).
+
+    uvicorn mock_llm:app --app-dir benchmarks --port 8100
+
+mock_server() starts one in a subprocess, for benchmarks.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PROMPT_TPS = float(os.getenv("MOCK_PROMPT_TPS", "400"))
+GEN_TPS = float(os.getenv("MOCK_GEN_TPS", "25"))
+SLOTS = int(os.getenv("MOCK_SLOTS", "1"))
+ANSWER_TOKENS = int(os.getenv("MOCK_ANSWER_TOKENS", "32"))
+OVERHEAD_MS = float(os.getenv("MOCK_OVERHEAD_MS", "2"))
+FAIL_RATE = float(os.getenv("MOCK_FAIL_RATE", "0"))
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def tokenize(messages: List[Dict]) -> List[str]:
+    rendered = "".join(
+        f"<|im_start|>{m['role']}\n{m['content']}<|im_end|>\n" for m in messages
+    )
+    return _TOKEN.findall(rendered + "<|im_start|>assistant\n")
+
+
+def common_prefix(a: List[str], b: List[str]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class Slot:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.tokens: List[str] = []
+
+
+app = FastAPI(title="Mock LLM")
+slots = [Slot() for _ in range(SLOTS)]
+
+
+def pick_slot(tokens: List[str], id_slot: Optional[int]) -> Slot:
+    if id_slot is not None and 0 <= id_slot < len(slots):
+        return slots[id_slot]
+    idle = [slot for slot in slots if not slot.lock.locked()] or slots
+    return max(idle, key=lambda slot: common_prefix(slot.tokens, tokens))
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "mock", "object": "model"}]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if random.random() < FAIL_RATE:
+        return JSONResponse({"error": "simulated failure"}, status_code=500)
+    tokens = tokenize(body["messages"])
+    max_tokens = min(int(body.get("max_tokens") or ANSWER_TOKENS), ANSWER_TOKENS)
+    cache_prompt = bool(body.get("cache_prompt", False))
+    slot = pick_slot(tokens, body.get("id_slot"))
+    answer = [f"tok{i} " for i in range(max_tokens)]
+
+    async def process_prompt() -> Dict:
+        cached = common_prefix(slot.tokens, tokens) if cache_prompt else 0
+        # llama.cpp always evaluates at least the last prompt token
+        cached = min(cached, len(tokens) - 1)
+        await asyncio.sleep(OVERHEAD_MS / 1000 + (len(tokens) - cached) / PROMPT_TPS)
+        slot.tokens = tokens
+        return {"prompt_n": len(tokens) - cached, "cache_n": cached}
+
+    usage = {
+        "prompt_tokens": len(tokens),
+        "completion_tokens": len(answer),
+        "total_tokens": len(tokens) + len(answer),
+    }
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+    if not body.get("stream"):
+        async with slot.lock:
+            timings = await process_prompt()
+            await asyncio.sleep(len(answer) / GEN_TPS)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "mock",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(answer)},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage,
+            "timings": timings,
+        }
+
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+    async def stream():
+        def chunk(choices, **extra):
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "model": "mock",
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async with slot.lock:
+            timings = await process_prompt()
+            for token in answer:
+                yield chunk([{"index": 0, "delta": {"content": token}}])
+                await asyncio.sleep(1 / GEN_TPS)
+        yield chunk(
+            [{"index": 0, "delta": {}, "finish_reason": "stop"}], timings=timings
+        )
+        if include_usage:
+            yield chunk([], usage=usage)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@contextmanager
+def mock_server(**env):
+    """Runs the mock on a free port; yields its /v1 base URL. Keyword
+    arguments override the MOCK_* settings, e.g. MOCK_GEN_TPS="50"."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "mock_llm:app",
+            "--app-dir", os.path.dirname(os.path.abspath(__file__)),
+            "--port", str(port), "--log-level", "warning",
+        ],
+        env={**os.environ, **env},
+    )
+    url = f"http://127.0.0.1:{port}/v1"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{url}/models", timeout=0.5)
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        yield url
+    finally:
+        proc.terminate()
+        proc.wait()
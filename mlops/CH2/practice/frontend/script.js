@@ -114,11 +114,17 @@ function addMessage(text, sender) {
     div.scrollIntoView({ behavior: 'smooth' });
 }
 
+// Hybrid search returns an RRF rank-fusion score, not a similarity: show it raw
+function formatScore(doc) {
+    if (doc.score_type === 'rrf') return `RRF ${doc.score.toFixed(3)}`;
+    return `${(doc.score * 100).toFixed(1)}% similaridade`;
+}
+
 function renderDebug(data) {
     // Retrieved Docs
     const docsHtml = data.retrieved_docs.map((doc, i) =>
         `<div class="doc-item">
-            <strong>Doc ${i + 1} (${(doc.score * 100).toFixed(1)}%):</strong> ${doc.text}
+            <strong>Doc ${i + 1} (${formatScore(doc)}):</strong> ${doc.text}
         </div>`
     ).join('');
     document.getElementById('debug-retrieved').innerHTML = docsHtml || "Nenhum documento relevante encontrado.";
@@ -166,8 +172,16 @@ async function ingestData() {
                 method: 'POST',
                 body: formData
             });
-            if (res.ok) success = true;
-            else {
+            if (res.ok) {
+                // Ingestion runs in background: follow the job until it finishes
+                const job = await waitForJob(await res.json(), status);
+                if (job.status === 'failed') {
+                    status.innerText = `Erro no arquivo: ${job.error}`;
+                    status.style.color = "var(--error)";
+                    return;
+                }
+                success = true;
+            } else {
                 let errDetail = "Erro desconhecido";
                 if (res.status === 413) {
                     errDetail = "Arquivo muito grande (limite excedido).";
@@ -200,6 +214,19 @@ async function ingestData() {
     }
 }
 
+async function waitForJob(job, status) {
+    while (job.status === 'queued' || job.status === 'running') {
+        status.innerText = job.total_chunks
+            ? `Processando... (${job.stage}: ${job.processed_chunks}/${job.total_chunks} trechos)`
+            : `Processando... (${job.stage})`;
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const res = await fetch(`${BASE_URL}/jobs/${job.job_id}`);
+        if (!res.ok) throw new Error("Job status error");
+        job = await res.json();
+    }
+    return job;
+}
+
 // Enter key support
 document.getElementById('user-input').addEventListener('keypress', (e) => {
     if (e.key === 'Enter') sendMessage();